@@ -1,36 +1,79 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, Response
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from werkzeug.utils import secure_filename
 from datetime import datetime, timedelta
-import os
+import queue
 from models.user import User
 from models.medical_report import MedicalReport
 from models.recovery_plan import RecoveryPlan
-from services import schedule_adjuster
+from services.schedule_adjuster import ScheduleAdjuster
 from services.report_analyzer import ReportAnalyzer
+from services.analysis_queue import AnalysisJob, AnalysisJobQueue
 from services.calendar_generator import CalendarGenerator
+from services.range_evaluator import reference_band
 from services.notification_manager import NotificationManager
-from utils.firebase_client import FirebaseClient
+from services.notification_hub import NotificationHub
+from utils.storage import create_storage
+from utils.gemini_client import GeminiClient, GeminiError
+from utils.upload_store import UploadStore
 from config import Config
 import uuid
 import email_validator
 from flask_wtf import FlaskForm
-from wtforms import StringField, PasswordField, SubmitField
-from wtforms.validators import DataRequired, Email, EqualTo
+from wtforms import StringField, PasswordField, SubmitField, SelectField, IntegerField
+from wtforms.validators import DataRequired, Email, EqualTo, Optional, NumberRange
 from werkzeug.security import generate_password_hash, check_password_hash
 
 app = Flask(__name__)
 app.config.from_object(Config)
-app.config['UPLOAD_FOLDER'] = 'uploads'
 
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 
-firebase_client = FirebaseClient()
-report_analyzer = ReportAnalyzer()
-calendar_generator = CalendarGenerator()
-notification_manager = NotificationManager()
+# Services are built by create_app(), not on import: process pool workers started from
+# `python app.py` re-run this file as __mp_main__, and must not build their own copies
+storage = None
+upload_store = None
+gemini_client = None
+report_analyzer = None
+calendar_generator = None
+notification_manager = None
+schedule_adjuster = None
+notification_hub = None
+analysis_queue = None
+
+def create_app():
+    """Build the services the routes use and return the app; run with `gunicorn "app:create_app()"`"""
+    global storage, upload_store, gemini_client, report_analyzer, calendar_generator
+    global notification_manager, schedule_adjuster, notification_hub, analysis_queue
+    if storage is not None:
+        return app
+    
+    # One storage client shared by every service
+    storage = create_storage()
+    upload_store = UploadStore(Config.UPLOAD_FOLDER, Config.UPLOAD_INDEX_PATH, Config.UPLOAD_CHUNK_BYTES)
+    # One Gemini client, so the rate limit and concurrency cap cover every caller
+    gemini_client = GeminiClient()
+    report_analyzer = ReportAnalyzer(storage, gemini_client)
+    calendar_generator = CalendarGenerator(gemini_client)
+    notification_manager = NotificationManager(storage)
+    schedule_adjuster = ScheduleAdjuster(storage, calendar_generator)
+    notification_hub = NotificationHub(
+        store=notification_manager.store,
+        poll_interval=Config.NOTIFICATION_STREAM_POLL_SECONDS,
+        max_pending=Config.NOTIFICATION_STREAM_MAX_PENDING,
+        max_per_user=Config.NOTIFICATION_STREAM_MAX_PER_USER,
+        max_connections=Config.NOTIFICATION_STREAM_MAX_CONNECTIONS
+    )
+    analysis_queue = AnalysisJobQueue(
+        report_analyzer=report_analyzer,
+        storage=storage,
+        max_workers=Config.ANALYSIS_WORKERS,
+        max_jobs_per_user=Config.ANALYSIS_MAX_JOBS_PER_USER,
+        stale_seconds=Config.ANALYSIS_STALE_SECONDS
+    )
+    return app
 
 class LoginForm(FlaskForm):
     email = StringField('Email', validators=[DataRequired(), Email()])
@@ -43,11 +86,19 @@ class RegistrationForm(FlaskForm):
     password = PasswordField('Password', validators=[DataRequired()])
     confirm_password = PasswordField('Confirm Password', 
                                    validators=[DataRequired(), EqualTo('password')])
+    # Optional; used to pick sex- and age-specific reference ranges for lab results
+    sex = SelectField('Sex', choices=[('', 'Prefer not to say'), ('female', 'Female'), ('male', 'Male')],
+                      default='')
+    birth_year = IntegerField('Year of Birth',
+                              validators=[Optional(), NumberRange(min=1900, max=datetime.now().year)])
     submit = SubmitField('Register')
 
+class DeleteReportForm(FlaskForm):
+    submit = SubmitField('Delete')
+
 @login_manager.user_loader
 def load_user(user_id):
-    return firebase_client.get_user(user_id)
+    return storage.get_user(user_id)
 
 @app.route('/')
 def index():
@@ -62,7 +113,7 @@ def login():
     
     form = LoginForm()
     if form.validate_on_submit():
-        user = firebase_client.get_user_by_email(form.email.data)
+        user = storage.get_user_by_email(form.email.data)
         if user and check_password_hash(user.password_hash, form.password.data):
             login_user(user)
             return redirect(url_for('dashboard'))
@@ -81,9 +132,11 @@ def register():
             id=str(uuid.uuid4()),
             name=form.name.data,
             email=form.email.data,
-            password_hash=hashed_password
+            password_hash=hashed_password,
+            sex=form.sex.data or None,
+            birth_year=form.birth_year.data
         )
-        firebase_client.create_user(user.to_dict())
+        storage.create_user(user.to_dict())
         flash('Your account has been created! You can now log in', 'success')
         return redirect(url_for('login'))
     return render_template('register.html', title='Register', form=form)
@@ -96,7 +149,25 @@ def logout():
 @app.route('/dashboard')
 @login_required
 def dashboard():
-    return render_template('dashboard.html', title='Dashboard')
+    return render_template('dashboard.html', title='Dashboard', notification_stream=True)
+
+@app.route('/plans')
+@login_required
+def list_plans():
+    # Reads one page of summary documents, never the plans' activities
+    plans, next_cursor = storage.list_user_plans(current_user.id,
+                                                 limit=Config.LISTING_PAGE_SIZE,
+                                                 cursor=request.args.get('cursor'))
+    return render_template('plans.html', title='Recovery Plans', plans=plans, next_cursor=next_cursor)
+
+@app.route('/reports')
+@login_required
+def list_reports():
+    reports, next_cursor = storage.list_user_reports(current_user.id,
+                                                     limit=Config.LISTING_PAGE_SIZE,
+                                                     cursor=request.args.get('cursor'))
+    return render_template('reports.html', title='Medical Reports', reports=reports, next_cursor=next_cursor,
+                           delete_form=DeleteReportForm())
 
 
 
@@ -114,32 +185,81 @@ def upload():
             return redirect(request.url)
         
         if file:
-            filename = secure_filename(file.filename)
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(filepath)
-            
-            # Save report to Firebase
+            # Stored by content hash, so re-uploads of the same file share one copy
             report_id = str(uuid.uuid4())
+            stored = upload_store.save(file.stream, secure_filename(file.filename), report_id)
             report = MedicalReport(
                 report_id=report_id,
                 user_id=current_user.id,
-                file_path=filepath,
-                upload_date=datetime.now()
+                file_path=stored.path,
+                upload_date=datetime.now(),
+                file_hash=stored.file_hash,
+                file_type=stored.file_type,
+                reference_band=reference_band(current_user.sex, current_user.age)
             )
-            firebase_client.save_report(report)
+            
+            try:
+                # Content analyzed before (here, on another host, or by another report) reuses that analysis;
+                # anything else is queued for background analysis
+                if report_analyzer.reuse_analysis(report):
+                    report.analysis_status = AnalysisJob.DONE
+                    report.analysis_updated_at = datetime.now()
+                    storage.save_report(report)
+                else:
+                    analysis_queue.submit(report)
+            except Exception:
+                # The report was never saved, so it must not keep the file alive
+                upload_store.release(report_id)
+                raise
             
             return redirect(url_for('analyze_report', report_id=report_id))
     
     return render_template('upload.html')
 
+@app.route('/reports/<report_id>/delete', methods=['POST'])
+@login_required
+def delete_report(report_id):
+    # Destructive, so only accepted from the app's own form with a valid CSRF token
+    if not DeleteReportForm().validate_on_submit():
+        return "Bad request", 400
+    
+    report = storage.get_report(report_id)
+    if not report or report.user_id != current_user.id:
+        return "Unauthorized", 403
+    
+    if analysis_queue.get_job(report_id):
+        flash('The report is still being analyzed; delete it once the analysis has finished')
+        return redirect(url_for('list_reports'))
+    
+    storage.delete_report(report_id)
+    # The stored file goes once no other report refers to the same content
+    upload_store.release(report_id)
+    flash('Report deleted')
+    return redirect(url_for('list_reports'))
+
 @app.route('/analyze/<report_id>')
 @login_required
 def analyze_report(report_id):
-    report = firebase_client.get_report(report_id)
+    report = storage.get_report(report_id)
     if report.user_id != current_user.id:
         return "Unauthorized", 403
     
-    deficiencies = report_analyzer.analyze_report(report.file_path)
+    if not report_analyzer.is_analyzed(report):
+        job = analysis_queue.get_job(report_id)
+        retry = request.args.get('retry') and report.analysis_status == AnalysisJob.FAILED
+        stale = analysis_queue.is_stale(report)
+        if not job and (report.analysis_status in (None, AnalysisJob.DONE) or retry or stale):
+            # Never queued, analyzed by an older analysis version, retried after a failure,
+            # or left queued/running by a worker that restarted
+            job = analysis_queue.submit(report)
+        status = job.status if job else report.analysis_status
+        error = job.error if job else report.analysis_error
+        return render_template('analysis_pending.html',
+                             report_id=report_id,
+                             status=status,
+                             error=error)
+    
+    deficiencies = report.deficiencies
     min_days, max_days = report_analyzer.calculate_recovery_time(deficiencies)
     
     return render_template('deficiencies.html', 
@@ -148,25 +268,61 @@ def analyze_report(report_id):
                          max_days=max_days,
                          report_id=report_id)
 
+@app.route('/analysis_status/<report_id>')
+@login_required
+def analysis_status(report_id):
+    job = analysis_queue.get_job(report_id)
+    if job:
+        if job.user_id != current_user.id:
+            return jsonify({"error": "Unauthorized"}), 403
+        return jsonify(job.to_dict())
+    
+    # The job finished or ran in another worker; the report document has the outcome
+    report = storage.get_report(report_id)
+    if not report or report.user_id != current_user.id:
+        return jsonify({"error": "Unauthorized"}), 403
+    
+    status = report.analysis_status
+    error = report.analysis_error
+    if report_analyzer.is_analyzed(report):
+        status = AnalysisJob.DONE
+    elif analysis_queue.is_stale(report):
+        # No worker will finish it; show the retry link instead of polling forever
+        status = AnalysisJob.FAILED
+        error = 'Analysis was interrupted before it finished'
+    return jsonify({
+        'report_id': report_id,
+        'status': status,
+        'error': error
+    })
+
 @app.route('/generate_calendar', methods=['POST'])
 @login_required
 def generate_calendar():
     report_id = request.form['report_id']
     selected_days = int(request.form['days'])
     
-    report = firebase_client.get_report(report_id)
+    report = storage.get_report(report_id)
     if report.user_id != current_user.id:
         return "Unauthorized", 403
     
-    deficiencies = report_analyzer.analyze_report(report.file_path)
-    calendar = calendar_generator.generate_calendar(
-        deficiencies=deficiencies,
-        days=selected_days,
-        user_id=current_user.id
-    )
+    if not report_analyzer.is_analyzed(report):
+        flash('The report is still being analyzed')
+        return redirect(url_for('analyze_report', report_id=report_id))
+    
+    try:
+        calendar = calendar_generator.generate_calendar(
+            deficiencies=report.deficiencies,
+            days=selected_days,
+            user_id=current_user.id
+        )
+    except GeminiError:
+        # Better to ask for a retry than to save a default plan in place of the real one
+        flash('The recovery plan could not be generated right now, please try again')
+        return redirect(url_for('analyze_report', report_id=report_id))
     
-    # Save calendar to Firebase
-    firebase_client.save_recovery_plan(calendar)
+    # Save calendar to storage
+    storage.save_recovery_plan(calendar)
     
     # Schedule notifications
     notification_manager.schedule_notifications(calendar)
@@ -176,26 +332,27 @@ def generate_calendar():
 @app.route('/calendar/<plan_id>')
 @login_required
 def view_calendar(plan_id):
-    plan = firebase_client.get_recovery_plan(plan_id)
+    plan = storage.get_recovery_plan(plan_id)
     if plan.user_id != current_user.id:
         return "Unauthorized", 403
     
-    return render_template('calendar.html', plan=plan)
+    return render_template('calendar.html', plan=plan, notification_stream=True)
 
 @app.route('/daily_schedule/<plan_id>/<date>')
 @login_required
 def daily_schedule(plan_id, date):
-    plan = firebase_client.get_recovery_plan(plan_id)
-    if plan.user_id != current_user.id:
+    if storage.get_plan_owner(plan_id) != current_user.id:
         return "Unauthorized", 403
     
+    # Only the requested day is read and decoded
     schedule_date = datetime.strptime(date, '%Y-%m-%d').date()
-    daily_activities = plan.get_daily_activities(schedule_date)
+    daily_activities = storage.get_plan_day(plan_id, schedule_date)
     
     return render_template('daily_schedule.html', 
                          activities=daily_activities,
                          date=date,
-                         plan_id=plan_id)
+                         plan_id=plan_id,
+                         notification_stream=True)
 
 @app.route('/update_activity', methods=['POST'])
 @login_required
@@ -206,12 +363,11 @@ def update_activity():
     activity_id = data['activity_id']
     completed = data['completed']
     
-    plan = firebase_client.get_recovery_plan(plan_id)
-    if plan.user_id != current_user.id:
+    if storage.get_plan_owner(plan_id) != current_user.id:
         return jsonify({"success": False, "error": "Unauthorized"}), 403
     
     # Update activity status
-    firebase_client.update_activity_status(plan_id, date, activity_id, completed)
+    storage.update_activity_status(plan_id, date, activity_id, completed)
     
     # If activity was missed, adjust the schedule
     if not completed:
@@ -219,6 +375,50 @@ def update_activity():
     
     return jsonify({"success": True})
 
+@app.route('/notifications/stream')
+@login_required
+def notification_stream():
+    user_id = current_user.id
+    # EventSource resends the id of the last event it saw when it reconnects
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id', '')
+    busy_retry_ms = Config.NOTIFICATION_STREAM_BUSY_RETRY_SECONDS * 1000
+    if not notification_hub.has_capacity(user_id):
+        # Temporary: the page's script reopens the stream after Retry-After
+        return Response(f"retry: {busy_retry_ms}\n\n", status=503, mimetype='text/event-stream',
+                        headers={'Retry-After': str(Config.NOTIFICATION_STREAM_BUSY_RETRY_SECONDS)})
+    
+    def events():
+        # Subscribed only once the response is actually streamed, so the finally below always releases it
+        subscription = None
+        try:
+            subscription = notification_hub.subscribe(user_id)
+            if subscription is None:
+                # Filled up since the check above; end the stream and let EventSource reconnect later
+                yield f"retry: {busy_retry_ms}\n\n"
+                return
+            yield f"retry: {Config.NOTIFICATION_STREAM_RETRY_MS}\n\n"
+            last_seq = 0
+            if last_event_id.isdigit():
+                for seq, event in notification_hub.replay(user_id, int(last_event_id)):
+                    last_seq = seq
+                    yield notification_hub.format_event(seq, event)
+            
+            while True:
+                try:
+                    seq, event = subscription.events.get(timeout=Config.NOTIFICATION_STREAM_HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    # Comment line keeps proxies from closing the idle connection
+                    yield ": heartbeat\n\n"
+                    continue
+                if seq > last_seq:  # skip events already sent by the replay
+                    last_seq = seq
+                    yield notification_hub.format_event(seq, event)
+        finally:
+            if subscription is not None:
+                notification_hub.unsubscribe(subscription)
+    
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 if __name__ == '__main__':
-    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-    app.run(debug=True)
\ No newline at end of file
+    create_app().run(debug=True)
\ No newline at end of file
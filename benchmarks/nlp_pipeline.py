@@ -0,0 +1,88 @@
+"""
+Model load time, per-report latency and peak RSS of NLPProcessor for each
+spaCy pipeline mode. 'legacy' is the previous setup: the full model, with
+patterns built by running the pipeline over every term and each report
+processed as one doc. Every mode runs in its own process so load time and
+memory are measured from a clean start.
+
+    python -m benchmarks.nlp_pipeline [reports]
+"""
+import json
+import random
+import resource
+import subprocess
+import sys
+import time
+
+MODES = ['legacy', 'full', 'slim', 'blank']
+
+DEFICIENCY_TERMS = ["deficiency", "low", "below normal", "insufficient", "borderline", "deficient", "inadequate"]
+TEST_TERMS = ["vitamin d", "vitamin b12", "iron", "hemoglobin", "calcium", "magnesium", "potassium", "sodium"]
+
+LINES = [
+    "Vitamin D, 25-Hydroxy: {:.1f} ng/mL (30 - 100)",
+    "Vitamin B12 {:.0f} pg/mL",
+    "Hemoglobin {:.1f} g/dL",
+    "Serum iron {:.0f} ug/dL",
+    "Calcium, total {:.1f} mg/dL",
+    "Patient reports fatigue; levels appear low compared to the previous panel from {:.0f} days ago.",
+    "Comments: values marked H or L are outside the laboratory reference interval {:.0f}.",
+]
+
+def make_report(rng: random.Random, lines: int) -> str:
+    return "\n".join(rng.choice(LINES).format(rng.uniform(5, 200)) for _ in range(lines))
+
+def run_mode(mode: str, count: int) -> dict:
+    started = time.perf_counter()
+    if mode == 'legacy':
+        import spacy
+        from spacy.matcher import PhraseMatcher
+        from utils.nlp_processor import NLPProcessor
+        processor = NLPProcessor.__new__(NLPProcessor)
+        processor.nlp = spacy.load("en_core_web_sm")
+        processor.deficiency_matcher = PhraseMatcher(processor.nlp.vocab)
+        processor.deficiency_matcher.add("DEFICIENCY", [processor.nlp(t) for t in DEFICIENCY_TERMS])
+        processor.test_matcher = PhraseMatcher(processor.nlp.vocab)
+        processor.test_matcher.add("TEST", [processor.nlp(t) for t in TEST_TERMS])
+        processor._chunks = lambda text: [text]
+    else:
+        from utils.nlp_processor import NLPProcessor
+        processor = NLPProcessor(pipeline=mode)
+    load = time.perf_counter() - started
+
+    rng = random.Random(1)
+    short = [make_report(rng, 30) for _ in range(count)]
+    long = [make_report(rng, 3000) for _ in range(max(1, count // 20))]
+
+    started = time.perf_counter()
+    for text in short:
+        processor.extract_medical_info(text)
+    short_ms = (time.perf_counter() - started) * 1000 / len(short)
+
+    started = time.perf_counter()
+    for text in long:
+        processor.extract_medical_info(text)
+    long_ms = (time.perf_counter() - started) * 1000 / len(long)
+
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+    return {'load_s': load, 'short_ms': short_ms, 'long_ms': long_ms, 'rss_mb': rss_mb}
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == '--mode':
+        print(json.dumps(run_mode(sys.argv[2], int(sys.argv[3]))))
+        return
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print(f"{'mode':<8}{'load':>10}{'30-line report':>18}{'3000-line report':>20}{'peak RSS':>12}")
+    for mode in MODES:
+        result = subprocess.run([sys.executable, '-m', 'benchmarks.nlp_pipeline', '--mode', mode, str(count)],
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            reason = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'failed'
+            print(f"{mode:<8}  unavailable: {reason}")
+            continue
+        r = json.loads(result.stdout.strip().splitlines()[-1])
+        print(f"{mode:<8}{r['load_s']:>9.2f}s{r['short_ms']:>16.2f}ms{r['long_ms']:>18.1f}ms{r['rss_mb']:>10.0f}MB")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Extraction time for large synthetic discharge bundles: the previous serial
+loop building the text with +=, PdfTextExtractor in-process, across the
+process pool, and across the pool with the early stop after the lab section.
+The PDFs are written by hand (Helvetica text pages) so no PDF library
+beyond PyPDF2 is needed.
+
+    python -m benchmarks.pdf_extraction [pages ...]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from services.rule_based_analyzer import LAB_LINE_PATTERN
+from utils.pdf_extractor import PdfTextExtractor
+
+NARRATIVE = [
+    "Patient was admitted with complaints of fatigue and generalised weakness.",
+    "Vital signs remained stable throughout the stay; no acute distress noted.",
+    "Physiotherapy review recommended gradual mobilisation and daily walking.",
+    "Discharge medications were reconciled with the pharmacy team on the ward.",
+    "Follow-up in the outpatient clinic is advised in four to six weeks.",
+]
+LAB_ROWS = [
+    "Vitamin D, 25-OH {:.1f} ng/mL 30 - 100",
+    "Vitamin B12 {:.0f} pg/mL 200 - 900",
+    "Hemoglobin {:.1f} g/dL 12.0 - 17.5",
+    "Serum Iron {:.0f} ug/dL 60 - 170",
+    "Calcium {:.1f} mg/dL 8.5 - 10.5",
+]
+LINES_PER_PAGE = 60
+
+def _escape(text: str) -> str:
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+def _content_stream(lines) -> bytes:
+    body = "BT /F1 9 Tf 11 TL 40 800 Td\n" + "".join(f"({_escape(line)}) Tj T*\n" for line in lines) + "ET"
+    return body.encode('latin-1')
+
+def write_pdf(path: str, pages: int, lab_pages: range, rng: random.Random):
+    """Write a text-only PDF: narrative pages, with lab tables on lab_pages"""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page in range(pages):
+        rows = LAB_ROWS if page in lab_pages else NARRATIVE
+        lines = [rng.choice(rows).format(rng.uniform(5, 200)) for _ in range(LINES_PER_PAGE)]
+        stream = _content_stream([f"Discharge summary - page {page + 1}"] + lines)
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects))
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % kid for kid in kids), len(kids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, 'wb') as file:
+        file.write(out)
+
+def extract_legacy(path: str) -> str:
+    import PyPDF2
+    with open(path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        text = ""
+        for page in reader.pages:
+            text += page.extract_text() or ""
+        return text
+
+def timed(label: str, func, baseline: float = None) -> float:
+    started = time.perf_counter()
+    text = func()
+    elapsed = time.perf_counter() - started
+    speedup = f"({baseline / elapsed:4.1f}x)" if baseline else ""
+    print(f"    {label:<34}{elapsed * 1000:9.0f} ms {speedup:>8}  {len(text) // 1024:6d} KiB of text")
+    return elapsed
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [50, 200]
+    workers = min(4, os.cpu_count() or 1)
+    serial = PdfTextExtractor(workers=1, batch_pages=8, parallel_min_pages=16)
+    parallel = PdfTextExtractor(workers=workers, batch_pages=8, parallel_min_pages=16)
+    rng = random.Random(3)
+    with tempfile.TemporaryDirectory() as directory:
+        # Start the pool outside the timings, as a long-running server would have it already
+        warmup = os.path.join(directory, 'warmup.pdf')
+        write_pdf(warmup, 32, range(0), rng)
+        parallel.extract(warmup)
+
+        for size in sizes:
+            path = os.path.join(directory, f'bundle_{size}.pdf')
+            # Lab results sit in the first fifth of the bundle, as in admission panels
+            write_pdf(path, size, range(size // 10, size // 5), rng)
+            print(f"{size} pages, {os.path.getsize(path) // 1024} KiB, {workers} workers")
+            baseline = timed("legacy serial +=", lambda: extract_legacy(path))
+            timed("extractor, in-process", lambda: serial.extract(path), baseline)
+            timed("extractor, process pool", lambda: parallel.extract(path), baseline)
+            timed("process pool, stop after results",
+                  lambda: parallel.extract(path, section_pattern=LAB_LINE_PATTERN, stop_after=3), baseline)
+    parallel.close()
+
+if __name__ == '__main__':
+    main()
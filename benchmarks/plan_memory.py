@@ -0,0 +1,117 @@
+"""
+Per-plan memory footprint of decoded recovery plans, with the slotted and
+interned models against the previous plain classes.
+
+    python -m benchmarks.plan_memory [plans] [days]
+"""
+import gc
+import json
+import random
+import sys
+import tracemalloc
+import uuid
+from datetime import date, timedelta
+from models.deficiency import Deficiency
+from models.recovery_plan import DailyActivity
+
+class LegacyDailyActivity:
+    """DailyActivity as it was before __slots__ and string sharing"""
+
+    def __init__(self, time, activity_type, description, duration="", intensity="medium",
+                 is_critical=False, completed=False, id=None):
+        self.id = id or str(uuid.uuid4())
+        self.time = time
+        self.activity_type = activity_type
+        self.description = description
+        self.duration = duration
+        self.intensity = intensity
+        self.is_critical = is_critical
+        self.completed = completed
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+class LegacyDeficiency:
+    def __init__(self, name, current_value, normal_range, severity="medium", is_border_value=False):
+        self.name = name
+        self.current_value = current_value
+        self.normal_range = normal_range
+        self.severity = severity
+        self.is_border_value = is_border_value
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+DESCRIPTIONS = [
+    "Brisk walk outdoors in the morning sun",
+    "Eat a portion of oily fish such as salmon or mackerel",
+    "Take the prescribed vitamin D supplement with breakfast",
+    "Light stretching and breathing exercises",
+    "Spinach and lentil salad with lemon dressing",
+    "Rest for 20 minutes without screens",
+    "Drink a glass of fortified milk",
+    "Gentle yoga session focusing on balance",
+]
+
+def plan_json(days: int, rng: random.Random) -> str:
+    """A plan shaped like the LLM output, serialized so every string is a fresh copy on load"""
+    start = date(2026, 1, 1)
+    daily = {}
+    for offset in range(days):
+        daily[(start + timedelta(days=offset)).isoformat()] = [
+            {
+                'id': str(uuid.uuid4()),
+                'time': rng.choice(['morning', 'afternoon', 'evening']),
+                'activity_type': rng.choice(['exercise', 'diet', 'medication', 'rest']),
+                'description': rng.choice(DESCRIPTIONS),
+                'duration': rng.choice(['', '15', '30']),
+                'intensity': rng.choice(['low', 'medium', 'high']),
+                'is_critical': rng.random() < 0.2,
+                'completed': False
+            }
+            for _ in range(5)
+        ]
+    deficiencies = [
+        {'name': 'Vitamin D', 'current_value': '14 ng/mL', 'normal_range': '30-100 ng/mL',
+         'severity': 'high', 'is_border_value': False},
+        {'name': 'Iron', 'current_value': '45 ug/dL', 'normal_range': '60-170 ug/dL',
+         'severity': 'medium', 'is_border_value': False},
+    ]
+    return json.dumps({'deficiencies': deficiencies, 'daily_activities': daily})
+
+def measure(documents, activity_cls, deficiency_cls) -> int:
+    """Bytes held by decoded plans, built the way RecoveryPlan.from_dict builds them"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    plans = []
+    for document in documents:
+        data = json.loads(document)
+        plans.append((
+            [deficiency_cls.from_dict(d) for d in data['deficiencies']],
+            {day: [activity_cls.from_dict(a) for a in activities]
+             for day, activities in data['daily_activities'].items()}
+        ))
+        del data
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used
+
+def main():
+    plans = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    days = int(sys.argv[2]) if len(sys.argv) > 2 else 90
+    rng = random.Random(42)
+    documents = [plan_json(days, rng) for _ in range(plans)]
+
+    legacy = measure(documents, LegacyDailyActivity, LegacyDeficiency)
+    compact = measure(documents, DailyActivity, Deficiency)
+    print(f"{plans} plans x {days} days x 5 activities")
+    print(f"  plain classes:        {legacy / plans / 1024:8.1f} KiB per plan")
+    print(f"  slotted + interned:   {compact / plans / 1024:8.1f} KiB per plan")
+    print(f"  reduction:            {100 * (1 - compact / legacy):8.1f} %")
+
+if __name__ == '__main__':
+    main()
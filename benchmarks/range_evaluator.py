@@ -0,0 +1,83 @@
+"""
+Throughput of the vectorized RangeEvaluator against a per-row Python loop
+doing the same unit conversion, range lookup, severity and border checks
+and building the same per-report Deficiency lists.
+
+    python -m benchmarks.range_evaluator [rows ...]
+"""
+import random
+import sys
+import time
+from models.deficiency import Deficiency
+from services.range_evaluator import BAND_RANGES, DEFAULT_BAND, REFERENCE_RANGES, RangeEvaluator, normalize_unit
+
+UNITS = {
+    'vitamin d': ['ng/mL', 'nmol/L'],
+    'vitamin b12': ['pg/mL', 'pmol/L'],
+    'iron': ['ug/dL', 'umol/L'],
+    'hemoglobin': ['g/dL', 'g/L'],
+    'calcium': ['mg/dL', 'mmol/L'],
+    'magnesium': ['mg/dL', 'mmol/L'],
+    'potassium': ['mmol/L', 'mEq/L'],
+    'sodium': ['mmol/L', 'mEq/L'],
+}
+BANDS = [DEFAULT_BAND, 'male', 'female', 'child']
+
+def make_rows(count: int, rng: random.Random):
+    reports, tests, values, units, bands = [], [], [], [], []
+    names = list(REFERENCE_RANGES)
+    for row in range(count):
+        test = rng.choice(names)
+        unit = rng.choice(UNITS[test])
+        reference = REFERENCE_RANGES[test]
+        canonical = rng.uniform(reference.low * 0.4, reference.high * 1.1)
+        reports.append(row // 8)
+        tests.append(test)
+        values.append(canonical / reference.conversions[normalize_unit(unit)])
+        units.append(unit)
+        bands.append(rng.choice(BANDS))
+    return reports, tests, values, units, bands
+
+def evaluate_per_row(reports, tests, values, units, bands):
+    """Scalar baseline: one dict lookup, conversion and comparison chain per row"""
+    result = {}
+    for report, test, value, unit, band in zip(reports, tests, values, units, bands):
+        deficiencies = result.setdefault(report, [])
+        reference = BAND_RANGES.get((test, band), REFERENCE_RANGES[test])
+        factor = reference.conversions.get(normalize_unit(unit))
+        if factor is None:
+            continue
+        value *= factor
+        if not reference.plausible[0] <= value <= reference.plausible[1] or value > reference.high:
+            continue
+        if value < reference.low + reference.border_margin:
+            ratio = value / reference.low
+            borderline = value >= reference.low
+            severity = "low" if borderline or ratio >= 0.8 else "medium" if ratio >= 0.5 else "high"
+            deficiencies.append(Deficiency(reference.name, f"{value:g} {unit}", reference.normal_range,
+                                           severity, borderline))
+    return result
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000, 100000, 1000000]
+    evaluator = RangeEvaluator()
+    rng = random.Random(7)
+    for size in sizes:
+        reports, tests, values, units, bands = make_rows(size, rng)
+
+        started = time.perf_counter()
+        evaluate_per_row(reports, tests, values, units, bands)
+        scalar = time.perf_counter() - started
+
+        started = time.perf_counter()
+        evaluation = evaluator.evaluate(reports, tests, values, units, bands)
+        vectorized = time.perf_counter() - started
+        evaluation.deficiencies_by_report()
+        total = time.perf_counter() - started
+
+        print(f"{size:>9} rows  per-row {scalar * 1000:9.1f} ms   "
+              f"vectorized {vectorized * 1000:8.1f} ms ({scalar / vectorized:5.1f}x)   "
+              f"with Deficiency lists {total * 1000:8.1f} ms ({scalar / total:4.1f}x)")
+
+if __name__ == '__main__':
+    main()
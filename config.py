@@ -14,4 +14,101 @@ class Config:
         "messagingSenderId": os.getenv('FIREBASE_MESSAGING_SENDER_ID'),
         "appId": os.getenv('FIREBASE_APP_ID')
     }
-    SECRET_KEY = os.getenv('SECRET_KEY') or 'dev-key-123'
\ No newline at end of file
+    SECRET_KEY = os.getenv('SECRET_KEY') or 'dev-key-123'
+    # 'firestore', 'sqlite' (local file at SQLITE_STORAGE_PATH) or 'memory'
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'firestore')
+    SQLITE_STORAGE_PATH = os.getenv('SQLITE_STORAGE_PATH', 'data/storage.db')
+    GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-2.0-flash')
+
+    # Gemini calls: an overall deadline per call, retries with jittered exponential backoff inside it,
+    # and limits shared by every caller in the process (set the rate to the project's RPM quota)
+    GEMINI_DEADLINE_SECONDS = float(os.getenv('GEMINI_DEADLINE_SECONDS', 90))
+    GEMINI_ATTEMPT_TIMEOUT_SECONDS = float(os.getenv('GEMINI_ATTEMPT_TIMEOUT_SECONDS', 45))
+    GEMINI_MAX_RETRIES = int(os.getenv('GEMINI_MAX_RETRIES', 3))
+    GEMINI_BACKOFF_BASE_SECONDS = float(os.getenv('GEMINI_BACKOFF_BASE_SECONDS', 1))
+    GEMINI_BACKOFF_MAX_SECONDS = float(os.getenv('GEMINI_BACKOFF_MAX_SECONDS', 20))
+    GEMINI_REQUESTS_PER_MINUTE = float(os.getenv('GEMINI_REQUESTS_PER_MINUTE', 60))  # 0 disables limiting
+    GEMINI_BURST = int(os.getenv('GEMINI_BURST', 5))
+    GEMINI_MAX_CONCURRENT = int(os.getenv('GEMINI_MAX_CONCURRENT', 8))
+
+    # Uploaded reports are stored once per content hash and reference-counted in UPLOAD_INDEX_PATH
+    UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', 'uploads')
+    UPLOAD_INDEX_PATH = os.getenv('UPLOAD_INDEX_PATH', 'data/uploads.db')
+    UPLOAD_CHUNK_BYTES = int(os.getenv('UPLOAD_CHUNK_BYTES', 1024 * 1024))
+
+    # Report analysis cache
+    ANALYSIS_CACHE_DIR = os.getenv('ANALYSIS_CACHE_DIR', 'cache/analysis')
+    ANALYSIS_CACHE_MAX_BYTES = int(os.getenv('ANALYSIS_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
+    # Extracted report text and NLP output: persisted by the storage backend, hot entries kept in process
+    EXTRACTION_CACHE_MAX_BYTES = int(os.getenv('EXTRACTION_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+
+    # Background report analysis
+    ANALYSIS_WORKERS = int(os.getenv('ANALYSIS_WORKERS', 4))
+    ANALYSIS_MAX_JOBS_PER_USER = int(os.getenv('ANALYSIS_MAX_JOBS_PER_USER', 2))  # per web worker process
+    # Queued/running reports no process has touched for this long are treated as abandoned and rerun
+    ANALYSIS_STALE_SECONDS = int(os.getenv('ANALYSIS_STALE_SECONDS', 15 * 60))
+
+    # Reports whose extracted test results the local reference table can classify skip Gemini
+    ANALYSIS_RULES_MIN_CONFIDENCE = float(os.getenv('ANALYSIS_RULES_MIN_CONFIDENCE', 0.8))
+    ANALYSIS_RULES_MIN_COVERAGE = float(os.getenv('ANALYSIS_RULES_MIN_COVERAGE', 0.9))  # above 1 disables the fast path
+
+    # spaCy pipeline for test/deficiency matching: blank (tokenizer only), slim or full en_core_web_sm
+    NLP_PIPELINE = os.getenv('NLP_PIPELINE', 'blank')
+    NLP_CHUNK_CHARS = int(os.getenv('NLP_CHUNK_CHARS', 20000))
+    NLP_BATCH_SIZE = int(os.getenv('NLP_BATCH_SIZE', 16))
+
+    # PDF text extraction: long PDFs are extracted in page batches across a process pool
+    PDF_WORKERS = int(os.getenv('PDF_WORKERS', 4))
+    PDF_BATCH_PAGES = int(os.getenv('PDF_BATCH_PAGES', 8))
+    PDF_PARALLEL_MIN_PAGES = int(os.getenv('PDF_PARALLEL_MIN_PAGES', 16))
+    PDF_MAX_PAGES = int(os.getenv('PDF_MAX_PAGES', 300))  # 0 for no limit
+    PDF_MAX_TEXT_BYTES = int(os.getenv('PDF_MAX_TEXT_BYTES', 2 * 1024 * 1024))  # 0 for no limit
+    # Pages without results after the lab section before extraction stops; 0 reads every page
+    PDF_STOP_AFTER_PAGES = int(os.getenv('PDF_STOP_AFTER_PAGES', 3))
+
+    # Text reports are decoded from one read; the encoding is guessed from the first TEXT_SAMPLE_BYTES
+    TEXT_SAMPLE_BYTES = int(os.getenv('TEXT_SAMPLE_BYTES', 64 * 1024))
+    TEXT_MMAP_MIN_BYTES = int(os.getenv('TEXT_MMAP_MIN_BYTES', 1024 * 1024))
+
+    # Reports are cut down to result rows and their context before being sent to Gemini
+    ANALYSIS_PROMPT_TOKEN_BUDGET = int(os.getenv('ANALYSIS_PROMPT_TOKEN_BUDGET', 2000))
+    ANALYSIS_PROMPT_CONTEXT_LINES = int(os.getenv('ANALYSIS_PROMPT_CONTEXT_LINES', 1))
+
+    # Recovery plan generation: 'single' asks for every day in one prompt,
+    # 'chunked' requests fixed-size day windows concurrently, 'template' asks for
+    # one week plus a progression rule and expands it locally
+    CALENDAR_GENERATION_MODE = os.getenv('CALENDAR_GENERATION_MODE', 'chunked')
+    CALENDAR_WINDOW_DAYS = int(os.getenv('CALENDAR_WINDOW_DAYS', 7))
+    CALENDAR_FANOUT = int(os.getenv('CALENDAR_FANOUT', 4))
+    CALENDAR_WINDOW_RETRIES = int(os.getenv('CALENDAR_WINDOW_RETRIES', 2))
+
+    # Reminder delivery: reminders are persisted here and sent by the worker holding the lease
+    NOTIFICATION_DB_PATH = os.getenv('NOTIFICATION_DB_PATH', 'data/notifications.db')
+    NOTIFICATION_LEASE_SECONDS = int(os.getenv('NOTIFICATION_LEASE_SECONDS', 30))
+    NOTIFICATION_POLL_SECONDS = int(os.getenv('NOTIFICATION_POLL_SECONDS', 5))
+    NOTIFICATION_CATCHUP_SECONDS = int(os.getenv('NOTIFICATION_CATCHUP_SECONDS', 60 * 60))
+    NOTIFICATION_LOAD_HORIZON_SECONDS = int(os.getenv('NOTIFICATION_LOAD_HORIZON_SECONDS', 24 * 60 * 60))
+
+    # Notification logs are buffered and written to Firestore in batches
+    NOTIFICATION_LOG_BATCH_SIZE = int(os.getenv('NOTIFICATION_LOG_BATCH_SIZE', 200))
+    NOTIFICATION_LOG_FLUSH_MS = int(os.getenv('NOTIFICATION_LOG_FLUSH_MS', 500))
+    NOTIFICATION_LOG_MAX_PENDING = int(os.getenv('NOTIFICATION_LOG_MAX_PENDING', 10000))
+
+    # Browser reminders over Server-Sent Events
+    NOTIFICATION_STREAM_POLL_SECONDS = float(os.getenv('NOTIFICATION_STREAM_POLL_SECONDS', 1))
+    NOTIFICATION_STREAM_HEARTBEAT_SECONDS = int(os.getenv('NOTIFICATION_STREAM_HEARTBEAT_SECONDS', 15))
+    NOTIFICATION_STREAM_RETRY_MS = int(os.getenv('NOTIFICATION_STREAM_RETRY_MS', 5000))
+    NOTIFICATION_STREAM_MAX_PENDING = int(os.getenv('NOTIFICATION_STREAM_MAX_PENDING', 100))
+    # Each open stream holds a server thread; keep these below the server's thread count
+    NOTIFICATION_STREAM_MAX_PER_USER = int(os.getenv('NOTIFICATION_STREAM_MAX_PER_USER', 4))
+    NOTIFICATION_STREAM_MAX_CONNECTIONS = int(os.getenv('NOTIFICATION_STREAM_MAX_CONNECTIONS', 5000))
+    NOTIFICATION_STREAM_BUSY_RETRY_SECONDS = int(os.getenv('NOTIFICATION_STREAM_BUSY_RETRY_SECONDS', 30))
+    NOTIFICATION_REPLAY_SECONDS = int(os.getenv('NOTIFICATION_REPLAY_SECONDS', 60 * 60))
+
+    # In-process cache in front of user lookups
+    USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', 10000))
+    USER_CACHE_TTL_SECONDS = int(os.getenv('USER_CACHE_TTL_SECONDS', 300))
+
+    # Dashboard listings of plans and reports
+    LISTING_PAGE_SIZE = int(os.getenv('LISTING_PAGE_SIZE', 20))
@@ -1,10 +1,14 @@
+from models.flyweight import strings
+
 class Deficiency:
+    __slots__ = ('name', 'current_value', 'normal_range', 'severity', 'is_border_value')
+    
     def __init__(self, name: str, current_value: str, normal_range: str, 
                  severity: str = "medium", is_border_value: bool = False):
-        self.name = name
+        self.name = strings.intern(name)
         self.current_value = current_value
-        self.normal_range = normal_range
-        self.severity = severity  # low, medium, high
+        self.normal_range = strings.intern(normal_range)
+        self.severity = strings.intern(severity)  # low, medium, high
         self.is_border_value = is_border_value
     
     def to_dict(self):
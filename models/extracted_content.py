@@ -0,0 +1,49 @@
+import hashlib
+from datetime import datetime
+from typing import Dict
+
+class ExtractedContent:
+    """
+    Normalized text of a report file and the NLPProcessor output for it.
+    Shared by every report with the same file content, and keyed by the
+    extractor version so changing extraction or matching redoes it.
+    """
+
+    def __init__(self, file_hash: str, extractor_version: str, text: str, encoding: str = None,
+                 medical_info: Dict = None, created_at: datetime = None):
+        self.file_hash = file_hash
+        self.extractor_version = extractor_version
+        self.text = text
+        self.encoding = encoding  # detected encoding of text files, None for PDF/DOCX
+        self.medical_info = medical_info or {'deficiency_mentions': [], 'test_results': {}}
+        self.created_at = created_at or datetime.now()
+
+    @property
+    def key(self) -> str:
+        return self.make_key(self.file_hash, self.extractor_version)
+
+    @staticmethod
+    def make_key(file_hash: str, extractor_version: str) -> str:
+        version_tag = hashlib.sha256(extractor_version.encode('utf-8')).hexdigest()[:16]
+        return f"{file_hash}_{version_tag}"
+
+    def to_dict(self):
+        return {
+            'file_hash': self.file_hash,
+            'extractor_version': self.extractor_version,
+            'text': self.text,
+            'encoding': self.encoding,
+            'medical_info': self.medical_info,
+            'created_at': self.created_at.isoformat()
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(
+            file_hash=data.get('file_hash'),
+            extractor_version=data.get('extractor_version'),
+            text=data.get('text', ''),
+            encoding=data.get('encoding'),
+            medical_info=data.get('medical_info'),
+            created_at=datetime.fromisoformat(data['created_at']) if data.get('created_at') else None
+        )
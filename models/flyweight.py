@@ -0,0 +1,36 @@
+from typing import Iterable, Optional
+
+class StringTable:
+    """
+    Bounded flyweight table for model strings. Plans and reports decoded from
+    JSON get a fresh copy of every string, so equal descriptions and names
+    repeated across days and plans are mapped to one shared object here.
+    Once the table is full, new strings are simply kept as they are.
+    """
+
+    def __init__(self, max_size: int, preload: Iterable[str] = ()):
+        self.max_size = max_size
+        self._strings = {}
+        for value in preload:
+            self.intern(value)
+
+    def intern(self, value: Optional[str]) -> Optional[str]:
+        if not isinstance(value, str):
+            return value
+        shared = self._strings.get(value)
+        if shared is not None:
+            return shared
+        if len(self._strings) >= self.max_size:
+            return value
+        return self._strings.setdefault(value, value)
+
+    def __len__(self) -> int:
+        return len(self._strings)
+
+# Shared by every model instance in the process. The categorical vocabularies (time of day,
+# activity type, intensity and severity) are entered first, so they stay shared once it is full
+strings = StringTable(max_size=50000, preload=(
+    'morning', 'afternoon', 'evening',
+    'exercise', 'diet', 'medication', 'rest',
+    'low', 'medium', 'high'
+))
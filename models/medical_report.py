@@ -4,12 +4,25 @@ from models.deficiency import Deficiency
 
 class MedicalReport:
     def __init__(self, report_id: str, user_id: str, file_path: str, upload_date: datetime, 
-                 deficiencies: List[Deficiency] = None):
+                 deficiencies: List[Deficiency] = None, file_hash: str = None,
+                 analysis_version: str = None, analysis_status: str = None,
+                 analysis_error: str = None, analysis_updated_at: datetime = None,
+                 reference_band: str = None, file_type: str = None):
         self.report_id = report_id
         self.user_id = user_id
         self.file_path = file_path
         self.upload_date = upload_date
         self.deficiencies = deficiencies or []
+        self.file_hash = file_hash  # SHA-256 of the uploaded file
+        self.analysis_version = analysis_version  # set once deficiencies hold a completed analysis
+        self.analysis_status = analysis_status  # queued, running, done, failed
+        self.analysis_error = analysis_error
+        self.analysis_updated_at = analysis_updated_at  # when analysis_status last changed
+        self.reference_band = reference_band  # sex/age band of the uploader when the report was uploaded
+        self.file_type = file_type  # extension of the uploaded file; file_path may be shared with other names
+    
+    def is_analyzed(self, analysis_version: str) -> bool:
+        return self.analysis_version == analysis_version
     
     def to_dict(self):
         return {
@@ -17,7 +30,14 @@ class MedicalReport:
             'user_id': self.user_id,
             'file_path': self.file_path,
             'upload_date': self.upload_date.isoformat(),
-            'deficiencies': [d.to_dict() for d in self.deficiencies]
+            'deficiencies': [d.to_dict() for d in self.deficiencies],
+            'file_hash': self.file_hash,
+            'analysis_version': self.analysis_version,
+            'analysis_status': self.analysis_status,
+            'analysis_error': self.analysis_error,
+            'analysis_updated_at': self.analysis_updated_at.isoformat() if self.analysis_updated_at else None,
+            'reference_band': self.reference_band,
+            'file_type': self.file_type
         }
     
     @classmethod
@@ -29,5 +49,13 @@ class MedicalReport:
             user_id=data.get('user_id'),
             file_path=data.get('file_path'),
             upload_date=datetime.fromisoformat(data.get('upload_date')),
-            deficiencies=deficiencies
-        )
\ No newline at end of file
+            deficiencies=deficiencies,
+            file_hash=data.get('file_hash'),
+            analysis_version=data.get('analysis_version'),
+            analysis_status=data.get('analysis_status'),
+            analysis_error=data.get('analysis_error'),
+            analysis_updated_at=datetime.fromisoformat(data['analysis_updated_at'])
+            if data.get('analysis_updated_at') else None,
+            reference_band=data.get('reference_band'),
+            file_type=data.get('file_type')
+        )
@@ -1,18 +1,26 @@
+import hashlib
+import json
+from collections.abc import MutableMapping
 from datetime import date, datetime
-from typing import Dict, List
+from typing import Dict, Iterable, List, Optional, Tuple
 from models.deficiency import Deficiency
+from models.flyweight import strings
 import uuid
 
 class DailyActivity:
+    # Slotted, with repeated strings shared, since a plan holds hundreds of these
+    __slots__ = ('id', 'time', 'activity_type', 'description', 'duration',
+                 'intensity', 'is_critical', 'completed')
+    
     def __init__(self, time: str, activity_type: str, description: str, 
                  duration: str = "", intensity: str = "medium", 
-                 is_critical: bool = False, completed: bool = False):
-        self.id = str(uuid.uuid4())
-        self.time = time  # morning, afternoon, evening
-        self.activity_type = activity_type  # exercise, diet, medication, rest
-        self.description = description
-        self.duration = duration  # in minutes for exercises
-        self.intensity = intensity  # low, medium, high
+                 is_critical: bool = False, completed: bool = False, id: str = None):
+        self.id = id or str(uuid.uuid4())
+        self.time = strings.intern(time)  # morning, afternoon, evening
+        self.activity_type = strings.intern(activity_type)  # exercise, diet, medication, rest
+        self.description = strings.intern(description)
+        self.duration = strings.intern(duration)  # in minutes for exercises
+        self.intensity = strings.intern(intensity)  # low, medium, high
         self.is_critical = is_critical  # whether missing this would significantly impact recovery
         self.completed = completed
     
@@ -48,35 +56,276 @@ class DailyActivity:
             duration=data.get('duration', ''),
             intensity=data.get('intensity', 'medium'),
             is_critical=data.get('is_critical', False),
-            completed=data.get('completed', False)
+            completed=data.get('completed', False),
+            id=data.get('id')
         )
 
+# Fields a day template stores for each activity; ids and completion are kept per day
+TEMPLATE_FIELDS = ('time', 'activity_type', 'description', 'duration', 'intensity', 'is_critical')
+
+def template_id(contents: List[dict]) -> str:
+    """Content hash, so identical days share one template within and across saves"""
+    encoded = json.dumps(contents, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()[:12]
+
+def encode_day(day: date, activities: List[DailyActivity], templates: Dict[str, List[dict]],
+               template_hint: str = None) -> dict:
+    """
+    Per-day document as a reference into the plan's day_templates plus what is
+    specific to this day: activity ids, completion flags and extra activities
+    added after generation (by ScheduleAdjuster). A day that still starts with
+    the template it was loaded with keeps it, with anything after as extras.
+    """
+    contents = [{field: getattr(a, field) for field in TEMPLATE_FIELDS} for a in activities]
+    hinted = templates.get(template_hint)
+    if hinted is not None and contents[:len(hinted)] == hinted:
+        template, base = template_hint, len(hinted)
+    else:
+        template, base = template_id(contents), len(contents)
+        templates.setdefault(template, contents)
+    return {
+        'date': day.isoformat(),
+        'template': template,
+        'activity_order': [a.id for a in activities[:base]],
+        'completed': {a.id: True for a in activities[:base] if a.completed},
+        'extra_order': [a.id for a in activities[base:]],
+        'extras': {a.id: a.to_dict() for a in activities[base:]}
+    }
+
+def decode_day(data: dict, templates: Dict[str, List[dict]] = None) -> Tuple[date, List[DailyActivity]]:
+    day = date.fromisoformat(data.get('date'))
+    if 'template' not in data:
+        # Days written before templates keep every activity in full, keyed by id
+        activities = data.get('activities', {})
+        order = data.get('activity_order') or list(activities)
+        return day, [DailyActivity.from_dict(activities[activity_id]) for activity_id in order
+                     if activity_id in activities]
+
+    template = (templates or {}).get(data['template'], [])
+    completed = data.get('completed') or {}
+    extras = data.get('extras') or {}
+    activities = [
+        DailyActivity.from_dict(dict(content, id=activity_id, completed=bool(completed.get(activity_id))))
+        for activity_id, content in zip(data.get('activity_order', []), template)
+    ]
+    activities.extend(DailyActivity.from_dict(extras[activity_id]) for activity_id in data.get('extra_order', [])
+                      if activity_id in extras)
+    return day, activities
+
+def completion_path(data: dict, activity_id: str) -> Optional[Tuple[str, ...]]:
+    """Where an activity's completed flag lives in a stored day document, None if it isn't there"""
+    if 'template' not in data:
+        if activity_id in (data.get('activities') or {}):
+            return ('activities', activity_id, 'completed')
+        return None
+    if activity_id in (data.get('extras') or {}):
+        return ('extras', activity_id, 'completed')
+    if activity_id in data.get('activity_order', []):
+        return ('completed', activity_id)
+    return None
+
+def read_path(data: dict, path: Tuple[str, ...]):
+    for key in path:
+        data = (data or {}).get(key)
+    return data
+
+def set_path(data: dict, path: Tuple[str, ...], value):
+    for key in path[:-1]:
+        data = data.setdefault(key, {})
+    data[path[-1]] = value
+
+def count_day(data: dict) -> Tuple[int, int]:
+    """(total, completed) activities of a stored day document without decoding it"""
+    if 'template' not in data:
+        activities = (data.get('activities') or {}).values()
+        return len(activities), sum(1 for a in activities if a.get('completed'))
+    order = data.get('activity_order', [])
+    completed = data.get('completed') or {}
+    extras = (data.get('extras') or {}).values()
+    return (len(order) + len(extras),
+            sum(1 for activity_id in order if completed.get(activity_id))
+            + sum(1 for a in extras if a.get('completed')))
+
+class LazyDailyActivities(MutableMapping):
+    """
+    date -> List[DailyActivity] mapping that keeps the stored per-day documents
+    and only builds DailyActivity objects for the days that are accessed. It
+    also remembers which days changed since loading, so a plan update can
+    write just those days.
+    """
+
+    def __init__(self, day_documents: Iterable[dict] = (), templates: Dict[str, List[dict]] = None):
+        self.templates = dict(templates or {})  # template id -> activity contents
+        self._documents = {}  # date -> stored document, None for days set since loading
+        self._decoded = {}
+        self._loaded = {}  # date -> encoding of a decoded day as it was loaded
+        self._assigned = set()
+        self._removed = set()
+        for data in sorted(day_documents, key=lambda d: d.get('date')):
+            self._documents[date.fromisoformat(data.get('date'))] = data
+
+    @classmethod
+    def from_activities(cls, daily_activities: Dict[date, List[DailyActivity]]):
+        days = cls()
+        days.update(daily_activities)
+        return days
+
+    def __getitem__(self, day: date) -> List[DailyActivity]:
+        activities = self._decoded.get(day)
+        if activities is None:
+            data = self._documents[day]
+            activities = self._decoded[day] = decode_day(data, self.templates)[1]
+            self._loaded[day] = self._encode(day)
+        return activities
+
+    def __setitem__(self, day: date, activities: List[DailyActivity]):
+        self._documents[day] = None
+        self._decoded[day] = activities
+        self._loaded.pop(day, None)
+        self._assigned.add(day)
+        self._removed.discard(day)
+
+    def __delitem__(self, day: date):
+        del self._documents[day]
+        self._decoded.pop(day, None)
+        self._loaded.pop(day, None)
+        self._assigned.discard(day)
+        self._removed.add(day)
+
+    def __contains__(self, day) -> bool:
+        return day in self._documents
+
+    def __iter__(self):
+        return iter(self._documents)
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def _encode(self, day: date) -> dict:
+        stored = self._documents.get(day)
+        return encode_day(day, self._decoded[day], self.templates, stored.get('template') if stored else None)
+
+    def document(self, day: date) -> dict:
+        """Stored form of a day, re-encoded only if it was decoded"""
+        if day in self._decoded:
+            return self._encode(day)
+        return self._documents[day]
+
+    def templates_in_use(self) -> Dict[str, List[dict]]:
+        in_use = {self.document(day).get('template') for day in self._documents}
+        return {template: self.templates[template] for template in in_use if template in self.templates}
+
+    def dirty_days(self) -> List[date]:
+        # Decoded days may have been mutated in place, so compare them with what was loaded
+        return [day for day in self._decoded
+                if day in self._assigned or self._encode(day) != self._loaded.get(day)]
+
+    def removed_days(self) -> List[date]:
+        return list(self._removed)
+
+    def mark_saved(self):
+        for day in self.dirty_days():
+            self._documents[day] = self._loaded[day] = self._encode(day)
+        self._assigned.clear()
+        self._removed.clear()
+
+    def activity_counts(self) -> Tuple[int, int]:
+        """(total, completed) activities, read from the stored documents where possible"""
+        total = completed = 0
+        for day, data in self._documents.items():
+            if day in self._decoded:
+                day_total = len(self._decoded[day])
+                day_completed = sum(1 for a in self._decoded[day] if a.completed)
+            else:
+                day_total, day_completed = count_day(data)
+            total += day_total
+            completed += day_completed
+        return total, completed
+
 class RecoveryPlan:
     def __init__(self, plan_id: str, user_id: str, start_date: date, end_date: date, 
-                 deficiencies: List[Deficiency], daily_activities: Dict[date, List[DailyActivity]]):
+                 deficiencies: List[Deficiency], daily_activities: Dict[date, List[DailyActivity]],
+                 weekly_template: dict = None):
         self.plan_id = plan_id
         self.user_id = user_id
         self.start_date = start_date
         self.end_date = end_date
         self.deficiencies = deficiencies
+        if not isinstance(daily_activities, LazyDailyActivities):
+            daily_activities = LazyDailyActivities.from_activities(daily_activities)
         self.daily_activities = daily_activities
+        self.weekly_template = weekly_template  # template and progression the plan was expanded from, if any
+        self._activity_index = None  # activity id -> (date, activity), built on first lookup
     
     def get_daily_activities(self, date: date) -> List[DailyActivity]:
         return self.daily_activities.get(date, [])
     
+    def find_activity(self, activity_id: str, day: date = None) -> Optional[Tuple[date, DailyActivity]]:
+        """Look an activity up by id; passing its day avoids decoding the rest of the plan"""
+        if day is not None and self._activity_index is None:
+            for activity in self.daily_activities.get(day, []):
+                if activity.id == activity_id:
+                    return day, activity
+            return None
+        if self._activity_index is None:
+            self._activity_index = {
+                activity.id: (day, activity)
+                for day, activities in self.daily_activities.items()
+                for activity in activities
+            }
+        return self._activity_index.get(activity_id)
+    
+    def add_activity(self, day: date, activity: DailyActivity):
+        self.daily_activities.setdefault(day, []).append(activity)
+        if self._activity_index is not None:
+            self._activity_index[activity.id] = (day, activity)
+    
+    def invalidate_activity_index(self):
+        """Call after changing daily_activities other than through add_activity"""
+        self._activity_index = None
+    
+    def dirty_days(self) -> List[date]:
+        """Days added or changed since the plan was loaded or last saved"""
+        return self.daily_activities.dirty_days()
+    
+    def removed_days(self) -> List[date]:
+        return self.daily_activities.removed_days()
+    
+    def mark_saved(self):
+        self.daily_activities.mark_saved()
+    
+    def activity_counts(self) -> Tuple[int, int]:
+        return self.daily_activities.activity_counts()
+    
     def to_dict(self):
+        data = self.metadata_to_dict()
+        data['daily_activities'] = {
+            date.isoformat(): [a.to_dict() for a in activities]
+            for date, activities in self.daily_activities.items()
+        }
+        return data
+    
+    def metadata_to_dict(self):
+        """Everything except the daily activities, which are stored per day"""
         return {
             'plan_id': self.plan_id,
             'user_id': self.user_id,
             'start_date': self.start_date.isoformat(),
             'end_date': self.end_date.isoformat(),
             'deficiencies': [d.to_dict() for d in self.deficiencies],
-            'daily_activities': {
-                date.isoformat(): [a.to_dict() for a in activities]
-                for date, activities in self.daily_activities.items()
-            }
+            'weekly_template': self.weekly_template,
+            'day_templates': self.daily_activities.templates_in_use()
         }
     
+    def day_to_dict(self, day: date):
+        if day in self.daily_activities:
+            return self.daily_activities.document(day)
+        return encode_day(day, [], self.daily_activities.templates)
+    
+    @staticmethod
+    def day_from_dict(data: dict, templates: Dict[str, List[dict]] = None):
+        return decode_day(data, templates)
+    
     @classmethod
     def from_dict(cls, data: dict):
         from datetime import date
@@ -91,5 +340,15 @@ class RecoveryPlan:
             start_date=date.fromisoformat(data.get('start_date')),
             end_date=date.fromisoformat(data.get('end_date')),
             deficiencies=deficiencies,
-            daily_activities=daily_activities
-        )
\ No newline at end of file
+            daily_activities=daily_activities,
+            weekly_template=data.get('weekly_template')
+        )
+    
+    @classmethod
+    def from_documents(cls, metadata: dict, day_documents: List[dict]):
+        """Rebuild a plan from its metadata document and its per-day documents"""
+        plan = cls.from_dict(metadata)
+        # Activities are decoded per day on first access
+        plan.daily_activities = LazyDailyActivities(day_documents, metadata.get('day_templates'))
+        plan.invalidate_activity_index()
+        return plan
@@ -0,0 +1,112 @@
+from typing import List
+
+class PlanSummary:
+    """Small listing view of a RecoveryPlan, stored separately and kept current on every write"""
+
+    def __init__(self, plan_id: str, user_id: str, start_date: str, end_date: str,
+                 deficiency_names: List[str] = None, total_activities: int = 0,
+                 completed_activities: int = 0):
+        self.plan_id = plan_id
+        self.user_id = user_id
+        self.start_date = start_date  # ISO dates, kept as strings for ordering and display
+        self.end_date = end_date
+        self.deficiency_names = deficiency_names or []
+        self.total_activities = total_activities
+        self.completed_activities = completed_activities
+
+    @property
+    def completion_percentage(self) -> int:
+        if not self.total_activities:
+            return 0
+        return round(100 * self.completed_activities / self.total_activities)
+
+    @property
+    def cursor(self) -> str:
+        return f"{self.start_date}|{self.plan_id}"
+
+    def to_dict(self):
+        return {
+            'plan_id': self.plan_id,
+            'user_id': self.user_id,
+            'start_date': self.start_date,
+            'end_date': self.end_date,
+            'deficiency_names': self.deficiency_names,
+            'total_activities': self.total_activities,
+            'completed_activities': self.completed_activities
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(
+            plan_id=data.get('plan_id'),
+            user_id=data.get('user_id'),
+            start_date=data.get('start_date'),
+            end_date=data.get('end_date'),
+            deficiency_names=data.get('deficiency_names', []),
+            total_activities=data.get('total_activities', 0),
+            completed_activities=data.get('completed_activities', 0)
+        )
+
+    @classmethod
+    def from_plan(cls, plan):
+        total, completed = plan.activity_counts()
+        return cls(
+            plan_id=plan.plan_id,
+            user_id=plan.user_id,
+            start_date=plan.start_date.isoformat(),
+            end_date=plan.end_date.isoformat(),
+            deficiency_names=[d.name for d in plan.deficiencies],
+            total_activities=total,
+            completed_activities=completed
+        )
+
+class ReportSummary:
+    """Small listing view of a MedicalReport"""
+
+    def __init__(self, report_id: str, user_id: str, upload_date: str,
+                 deficiency_names: List[str] = None, analysis_status: str = None):
+        self.report_id = report_id
+        self.user_id = user_id
+        self.upload_date = upload_date  # ISO timestamp
+        self.deficiency_names = deficiency_names or []
+        self.analysis_status = analysis_status
+
+    @property
+    def cursor(self) -> str:
+        return f"{self.upload_date}|{self.report_id}"
+
+    def to_dict(self):
+        return {
+            'report_id': self.report_id,
+            'user_id': self.user_id,
+            'upload_date': self.upload_date,
+            'deficiency_names': self.deficiency_names,
+            'analysis_status': self.analysis_status
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(
+            report_id=data.get('report_id'),
+            user_id=data.get('user_id'),
+            upload_date=data.get('upload_date'),
+            deficiency_names=data.get('deficiency_names', []),
+            analysis_status=data.get('analysis_status')
+        )
+
+    @classmethod
+    def from_report(cls, report):
+        return cls(
+            report_id=report.report_id,
+            user_id=report.user_id,
+            upload_date=report.upload_date.isoformat(),
+            deficiency_names=[d.name for d in report.deficiencies],
+            analysis_status=report.analysis_status
+        )
+
+def parse_cursor(cursor: str):
+    """Split a listing cursor into (sort value, id); None for the first page"""
+    if not cursor or '|' not in cursor:
+        return None
+    sort_value, item_id = cursor.split('|', 1)
+    return sort_value, item_id
@@ -1,13 +1,23 @@
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
+from datetime import datetime
 
 class User(UserMixin):
-    def __init__(self, id: str, email: str, name: str, password_hash: str = None, medical_history: dict = None):
+    def __init__(self, id: str, email: str, name: str, password_hash: str = None, medical_history: dict = None,
+                 sex: str = None, birth_year: int = None):
         self.id = id
         self.email = email
         self.name = name
         self.password_hash = password_hash
         self.medical_history = medical_history or {}
+        self.sex = sex  # male, female, or None if not given; picks sex-specific reference ranges
+        self.birth_year = birth_year
+    
+    @property
+    def age(self):
+        if not self.birth_year:
+            return None
+        return datetime.now().year - self.birth_year
     
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
@@ -21,7 +31,9 @@ class User(UserMixin):
             'email': self.email,
             'name': self.name,
             'password_hash': self.password_hash,
-            'medical_history': self.medical_history
+            'medical_history': self.medical_history,
+            'sex': self.sex,
+            'birth_year': self.birth_year
         }
     
     @classmethod
@@ -31,5 +43,7 @@ class User(UserMixin):
             email=data.get('email'),
             name=data.get('name'),
             password_hash=data.get('password_hash'),
-            medical_history=data.get('medical_history', {})
+            medical_history=data.get('medical_history', {}),
+            sex=data.get('sex'),
+            birth_year=data.get('birth_year')
         )
\ No newline at end of file
@@ -0,0 +1,150 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Dict, Optional
+from models.medical_report import MedicalReport
+import logging
+
+class AnalysisJob:
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    def __init__(self, report: MedicalReport):
+        self.report = report
+        self.report_id = report.report_id
+        self.user_id = report.user_id
+        self.status = self.QUEUED
+        self.error = None
+        self.created_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+
+    def to_dict(self):
+        return {
+            'report_id': self.report_id,
+            'status': self.status,
+            'error': self.error,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+class AnalysisJobQueue:
+    """
+    Runs report analysis (extraction -> NLP -> Gemini) on a bounded worker pool
+    so request handlers never wait on the LLM. Each user gets at most
+    max_jobs_per_user running jobs; the rest wait in that user's backlog.
+    Jobs and that cap are per process: with several web workers a user can
+    have max_jobs_per_user running in each.
+    """
+
+    def __init__(self, report_analyzer, storage, max_workers: int, max_jobs_per_user: int,
+                 stale_seconds: float = 15 * 60):
+        self.report_analyzer = report_analyzer
+        self.storage = storage
+        self.max_jobs_per_user = max_jobs_per_user
+        self.stale_seconds = stale_seconds
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="analysis")
+        self.logger = logging.getLogger(__name__)
+        self._lock = Lock()
+        self._jobs: Dict[str, AnalysisJob] = {}  # active jobs by report id
+        self._running_per_user: Dict[str, int] = {}
+        self._backlog_per_user: Dict[str, deque] = {}
+
+    def submit(self, report: MedicalReport) -> AnalysisJob:
+        """Enqueue analysis of a report; returns the existing job if one is already active"""
+        with self._lock:
+            job = self._jobs.get(report.report_id)
+            if job:
+                return job
+            job = AnalysisJob(report)
+            self._jobs[job.report_id] = job
+
+        # Persist the queued state before a worker can overwrite it
+        report.analysis_status = AnalysisJob.QUEUED
+        report.analysis_error = None
+        report.analysis_updated_at = datetime.now()
+        try:
+            self.storage.save_report(report)
+        except Exception:
+            with self._lock:
+                self._jobs.pop(job.report_id, None)
+            raise
+
+        with self._lock:
+            if self._running_per_user.get(job.user_id, 0) < self.max_jobs_per_user:
+                self._start(job)
+            else:
+                self._backlog_per_user.setdefault(job.user_id, deque()).append(job)
+        return job
+
+    def get_job(self, report_id: str) -> Optional[AnalysisJob]:
+        with self._lock:
+            return self._jobs.get(report_id)
+
+    def is_stale(self, report: MedicalReport) -> bool:
+        """
+        True for a report stored as queued or running that no job in this
+        process owns and whose status hasn't changed in stale_seconds: the
+        worker that queued it restarted or died, so nothing will finish it.
+        """
+        if report.analysis_status not in (AnalysisJob.QUEUED, AnalysisJob.RUNNING):
+            return False
+        if self.get_job(report.report_id):
+            return False
+        updated_at = report.analysis_updated_at
+        return updated_at is None or datetime.now() - updated_at > timedelta(seconds=self.stale_seconds)
+
+    def shutdown(self, wait: bool = True):
+        self.executor.shutdown(wait=wait, cancel_futures=not wait)
+
+    def _start(self, job: AnalysisJob):
+        # Must be called with self._lock held
+        self._running_per_user[job.user_id] = self._running_per_user.get(job.user_id, 0) + 1
+        self.executor.submit(self._run, job)
+
+    def _run(self, job: AnalysisJob):
+        report = job.report
+        job.status = AnalysisJob.RUNNING
+        job.started_at = datetime.now()
+        try:
+            report.analysis_status = AnalysisJob.RUNNING
+            report.analysis_updated_at = datetime.now()
+            self.storage.save_report(report)
+
+            self.report_analyzer.analyze_medical_report(report)
+            report.analysis_status = AnalysisJob.DONE
+        except Exception as e:
+            self.logger.error(f"Analysis job for report {job.report_id} failed: {str(e)}")
+            report.analysis_status = AnalysisJob.FAILED
+            report.analysis_error = str(e)
+        report.analysis_updated_at = datetime.now()
+
+        try:
+            self.storage.save_report(report)
+        except Exception as e:
+            self.logger.error(f"Failed to persist analysis result for report {job.report_id}: {str(e)}")
+            report.analysis_status = AnalysisJob.FAILED
+            report.analysis_error = str(e)
+        finally:
+            # Only report the outcome once it is visible to every worker
+            job.status = report.analysis_status
+            job.error = report.analysis_error
+            job.finished_at = datetime.now()
+            self._finish(job)
+
+    def _finish(self, job: AnalysisJob):
+        with self._lock:
+            self._jobs.pop(job.report_id, None)
+            self._running_per_user[job.user_id] -= 1
+
+            backlog = self._backlog_per_user.get(job.user_id)
+            if backlog:
+                self._start(backlog.popleft())
+                if not backlog:
+                    del self._backlog_per_user[job.user_id]
+            elif not self._running_per_user[job.user_id]:
+                del self._running_per_user[job.user_id]
@@ -2,30 +2,40 @@ from langchain.chains import LLMChain
 from langchain.prompts import PromptTemplate
 from models.recovery_plan import RecoveryPlan, DailyActivity
 from models.deficiency import Deficiency
-from utils.gemini_client import GeminiClient
+from utils.gemini_client import GeminiClient, GeminiError
+from services.template_expander import ProgressionRule, WeeklyTemplateExpander
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import List, Dict, Any
 import json
+import logging
+import re
 from config import Config
 from dotenv import load_dotenv
 
 load_dotenv()
 
 class CalendarGenerator:
-    def __init__(self):
-        self.gemini_client = GeminiClient()
+    def __init__(self, gemini_client: GeminiClient = None):
+        self.gemini_client = gemini_client or GeminiClient()
+        self.template_expander = WeeklyTemplateExpander()
+        self.logger = logging.getLogger(__name__)
     
     def generate_calendar(self, deficiencies: List[Deficiency], days: int, user_id: str) -> RecoveryPlan:
         plan_id = f"plan_{user_id}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
         start_date = datetime.now().date()
         end_date = start_date + timedelta(days=days-1)
         
-        # Generate the recovery plan using Gemini
-        prompt = self._build_calendar_prompt(deficiencies, days)
-        response = self.gemini_client.generate_text(prompt)
-        
-        # Parse the response
-        daily_activities = self._parse_calendar_response(response, start_date, end_date)
+        weekly_template = None
+        if Config.CALENDAR_GENERATION_MODE == 'template':
+            daily_activities, weekly_template = self._generate_from_template(deficiencies, days, start_date)
+        elif Config.CALENDAR_GENERATION_MODE == 'chunked':
+            daily_activities = self._generate_chunked(deficiencies, days, start_date)
+        else:
+            # Generate the whole recovery plan with a single Gemini call
+            prompt = self._build_calendar_prompt(deficiencies, days)
+            response = self.gemini_client.generate_text(prompt)
+            daily_activities = self._parse_calendar_response(response, start_date, end_date)
         
         # Create the recovery plan
         plan = RecoveryPlan(
@@ -34,19 +44,165 @@ class CalendarGenerator:
             start_date=start_date,
             end_date=end_date,
             deficiencies=deficiencies,
-            daily_activities=daily_activities
+            daily_activities=daily_activities,
+            weekly_template=weekly_template
         )
         
         return plan
     
-    def _build_calendar_prompt(self, deficiencies: List[Deficiency], days: int) -> str:
+    def _generate_chunked(self, deficiencies: List[Deficiency], days: int, start_date) -> Dict[datetime, List[DailyActivity]]:
+        """Generate the plan as fixed-size day windows requested concurrently, then stitch them together"""
+        window_days = max(1, Config.CALENDAR_WINDOW_DAYS)
+        windows = [(first_day, min(window_days, days - first_day + 1))
+                   for first_day in range(1, days + 1, window_days)]
+        
+        daily_activities = {}
+        fan_out = max(1, min(Config.CALENDAR_FANOUT, len(windows)))
+        with ThreadPoolExecutor(max_workers=fan_out, thread_name_prefix="calendar") as executor:
+            futures = [
+                executor.submit(self._generate_window, deficiencies, days, first_day, length,
+                                start_date + timedelta(days=first_day - 1))
+                for first_day, length in windows
+            ]
+            try:
+                for future in futures:
+                    daily_activities.update(future.result())
+            except GeminiError:
+                # A window that never got an answer fails the plan; don't start the ones still waiting
+                for future in futures:
+                    future.cancel()
+                raise
+        
+        return daily_activities
+    
+    def _generate_window(self, deficiencies: List[Deficiency], days: int, first_day: int,
+                         length: int, window_start) -> Dict[datetime, List[DailyActivity]]:
+        """Generate one window of days, retrying only this window when Gemini's answer is unusable"""
+        window_end = window_start + timedelta(days=length-1)
+        prompt = self._build_calendar_prompt(deficiencies, days, first_day=first_day, window_days=length)
+        
+        activities = {}
+        for attempt in range(1 + Config.CALENDAR_WINDOW_RETRIES):
+            # GeminiError is left to the caller: the client has already retried within its deadline
+            response = self.gemini_client.generate_text(prompt)
+            try:
+                activities = self._parse_daily_plans(response, window_start, window_end)
+            except Exception as e:
+                self.logger.warning(f"Calendar window starting day {first_day} attempt {attempt + 1} failed: {e}")
+                continue
+            if len(activities) == length:
+                return activities
+            self.logger.warning(f"Calendar window starting day {first_day} attempt {attempt + 1} "
+                                f"returned {len(activities)} of {length} days")
+        
+        # Keep whatever days were generated and fall back to defaults only for the missing ones
+        self.logger.warning(f"Calendar window starting day {first_day} uses defaults for "
+                            f"{length - len(activities)} of {length} days")
+        defaults = self._default_plan(window_start, window_end)
+        defaults.update(activities)
+        return defaults
+    
+    def _generate_from_template(self, deficiencies: List[Deficiency], days: int, start_date):
+        """Ask Gemini for one week plus a progression rule and expand it locally to the full plan"""
+        end_date = start_date + timedelta(days=days-1)
+        prompt = self._build_template_prompt(deficiencies, days)
+        
+        for attempt in range(1 + Config.CALENDAR_WINDOW_RETRIES):
+            # GeminiError is left to the caller: the client has already retried within its deadline
+            response = self.gemini_client.generate_text(prompt)
+            try:
+                weekly_template = self._parse_template_response(response)
+                daily_activities = self.template_expander.expand(
+                    [day_plan['activities'] for day_plan in weekly_template['week_template']],
+                    ProgressionRule.from_dict(weekly_template['progression']),
+                    start_date,
+                    days
+                )
+                return daily_activities, weekly_template
+            except Exception as e:
+                self.logger.warning(f"Weekly template attempt {attempt + 1} failed: {e}")
+        
+        self.logger.error(f"No usable weekly template after {attempt + 1} attempts, using the default plan")
+        return self._default_plan(start_date, end_date), None
+    
+    def _parse_template_response(self, response: str) -> dict:
+        json_str = re.search(r'\{.*\}', response, re.DOTALL).group()
+        data = json.loads(json_str)
+        
+        week_template = [day_plan.get('activities', []) for day_plan in data.get('week_template', [])[:7]]
+        if not any(week_template):
+            raise ValueError("Response contains no template activities")
+        
+        return {
+            # Days stay wrapped in maps: Firestore can't store an array directly inside an array
+            'week_template': [{'activities': activities} for activities in week_template],
+            'progression': ProgressionRule.from_dict(data.get('progression')).to_dict()
+        }
+    
+    def _build_template_prompt(self, deficiencies: List[Deficiency], days: int) -> str:
         deficiency_list = "\n".join([
             f"- {d.name}: Current {d.current_value}, Normal range {d.normal_range}, Severity: {d.severity}"
             for d in deficiencies
         ])
         
         prompt = f"""
-        Create a detailed recovery plan calendar for {days} days to address the following deficiencies:
+        Create a one-week (7 day) recovery plan template that will be repeated for {days} days
+        to address the following deficiencies:
+        {deficiency_list}
+        
+        The template should include:
+        1. Daily exercises tailored to the deficiencies
+        2. A diet plan with specific meals and supplements
+        3. Medication schedule if needed
+        4. Rest periods and sleep recommendations
+        
+        Also describe how the exercises should progress from week to week.
+        
+        Format the output as JSON with the following structure:
+        {{
+            "week_template": [
+                {{
+                    "day": 1,
+                    "activities": [
+                        {{
+                            "time": "morning/afternoon/evening",
+                            "type": "exercise/diet/medication/rest",
+                            "description": "Detailed description",
+                            "duration": "Duration in minutes as a number if applicable",
+                            "intensity": "low/medium/high if applicable",
+                            "is_critical": true/false
+                        }},
+                        ...
+                    ]
+                }},
+                ... exactly 7 days
+            ],
+            "progression": {{
+                "duration_increase_per_week": "Minutes to add to each exercise per week, 0 for none",
+                "max_duration": "Maximum exercise duration in minutes, 0 for no limit",
+                "intensity_ramp_weeks": "Raise exercise intensity one level every N weeks, 0 to keep it constant"
+            }}
+        }}
+        """
+        
+        return prompt
+    
+    def _build_calendar_prompt(self, deficiencies: List[Deficiency], days: int,
+                               first_day: int = 1, window_days: int = None) -> str:
+        deficiency_list = "\n".join([
+            f"- {d.name}: Current {d.current_value}, Normal range {d.normal_range}, Severity: {d.severity}"
+            for d in deficiencies
+        ])
+        
+        if window_days is None:
+            scope = f"Create a detailed recovery plan calendar for {days} days"
+        else:
+            last_day = first_day + window_days - 1
+            scope = (f"Create days {first_day} to {last_day} (exactly {window_days} days) of a detailed "
+                     f"{days}-day recovery plan calendar, progressing appropriately for that point in the plan,")
+        
+        prompt = f"""
+        {scope} to address the following deficiencies:
         {deficiency_list}
         
         The plan should include:
@@ -88,64 +244,72 @@ class CalendarGenerator:
         return prompt
     
     def _parse_calendar_response(self, response: str, start_date: datetime, end_date: datetime) -> Dict[datetime, List[DailyActivity]]:
-        daily_activities = {}
-        
         try:
-            # Extract JSON part from the response
-            import re
-            import json
-            json_str = re.search(r'\{.*\}', response, re.DOTALL).group()
-            data = json.loads(json_str)
-            
-            current_date = start_date
-            for day_plan in data.get('daily_plans', []):
-                activities = []
-                for activity_data in day_plan.get('activities', []):
-                    activity = DailyActivity(
-                        time=activity_data.get('time', 'morning'),
-                        activity_type=activity_data.get('type', 'exercise'),
-                        description=activity_data.get('description', ''),
-                        duration=activity_data.get('duration', ''),
-                        intensity=activity_data.get('intensity', 'medium'),
-                        is_critical=activity_data.get('is_critical', False),
-                        completed=False
-                    )
-                    activities.append(activity)
-                
-                daily_activities[current_date] = activities
-                current_date += timedelta(days=1)
-                
-                if current_date > end_date:
-                    break
+            return self._parse_daily_plans(response, start_date, end_date)
         except Exception as e:
-            print(f"Error parsing calendar response: {e}")
+            self.logger.warning(f"Error parsing calendar response: {e}")
             # Fallback to generating a simple plan if parsing fails
-            current_date = start_date
-            while current_date <= end_date:
-                activities = []
-                # Morning exercise
-                activities.append(DailyActivity(
-                    time="morning",
-                    activity_type="exercise",
-                    description="30 minute walk",
-                    duration="30",
-                    intensity="low",
-                    is_critical=True,
-                    completed=False
-                ))
-                # Breakfast
-                activities.append(DailyActivity(
-                    time="morning",
-                    activity_type="diet",
-                    description="Balanced breakfast with proteins and vitamins",
-                    duration="",
-                    intensity="",
-                    is_critical=True,
+            return self._default_plan(start_date, end_date)
+    
+    def _parse_daily_plans(self, response: str, start_date: datetime, end_date: datetime) -> Dict[datetime, List[DailyActivity]]:
+        """Parse Gemini's daily_plans JSON; raises if the response is not usable"""
+        daily_activities = {}
+        
+        # Extract JSON part from the response
+        json_str = re.search(r'\{.*\}', response, re.DOTALL).group()
+        data = json.loads(json_str)
+        
+        current_date = start_date
+        for day_plan in data.get('daily_plans', []):
+            if current_date > end_date:
+                break
+            
+            activities = []
+            for activity_data in day_plan.get('activities', []):
+                activity = DailyActivity(
+                    time=activity_data.get('time', 'morning'),
+                    activity_type=activity_data.get('type', 'exercise'),
+                    description=activity_data.get('description', ''),
+                    duration=activity_data.get('duration', ''),
+                    intensity=activity_data.get('intensity', 'medium'),
+                    is_critical=activity_data.get('is_critical', False),
                     completed=False
-                ))
-                # Add more default activities as needed
-                
-                daily_activities[current_date] = activities
-                current_date += timedelta(days=1)
+                )
+                activities.append(activity)
+            
+            daily_activities[current_date] = activities
+            current_date += timedelta(days=1)
+        
+        return daily_activities
+    
+    def _default_plan(self, start_date: datetime, end_date: datetime) -> Dict[datetime, List[DailyActivity]]:
+        daily_activities = {}
+        current_date = start_date
+        while current_date <= end_date:
+            activities = []
+            # Morning exercise
+            activities.append(DailyActivity(
+                time="morning",
+                activity_type="exercise",
+                description="30 minute walk",
+                duration="30",
+                intensity="low",
+                is_critical=True,
+                completed=False
+            ))
+            # Breakfast
+            activities.append(DailyActivity(
+                time="morning",
+                activity_type="diet",
+                description="Balanced breakfast with proteins and vitamins",
+                duration="",
+                intensity="",
+                is_critical=True,
+                completed=False
+            ))
+            # Add more default activities as needed
+            
+            daily_activities[current_date] = activities
+            current_date += timedelta(days=1)
         
-        return daily_activities
\ No newline at end of file
+        return daily_activities
@@ -0,0 +1,109 @@
+import json
+import logging
+import queue
+from threading import Event, Lock, Thread
+from typing import Dict, Optional, Set
+from services.notification_store import NotificationStore
+
+class Subscription:
+    def __init__(self, user_id: str, max_pending: int):
+        self.user_id = user_id
+        self.events = queue.Queue(maxsize=max_pending)
+
+    def push(self, seq: int, event: dict):
+        try:
+            self.events.put_nowait((seq, event))
+        except queue.Full:
+            # A stalled client loses its oldest reminder rather than holding up the others
+            try:
+                self.events.get_nowait()
+            except queue.Empty:
+                pass
+            self.events.put_nowait((seq, event))
+
+class NotificationHub:
+    """
+    In-process fan-out of delivered reminders to connected browsers.
+
+    Each web process runs one relay thread that tails the NotificationStore
+    delivery outbox and pushes new events onto the queues of that user's
+    subscribers. There is no per-connection polling, but each open stream
+    still occupies a server thread or worker, so connections are capped per
+    user and per process.
+    """
+
+    def __init__(self, store: NotificationStore, poll_interval: float, max_pending: int,
+                 max_per_user: int = 4, max_connections: int = 5000):
+        self.store = store
+        self.poll_interval = poll_interval
+        self.max_pending = max_pending
+        self.max_per_user = max_per_user
+        self.max_connections = max_connections
+        self.logger = logging.getLogger(__name__)
+        self._lock = Lock()
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._connections = 0
+        self._stopped = Event()
+        self._thread = None
+        self._last_seq = 0
+
+    def has_capacity(self, user_id: str) -> bool:
+        """Whether a subscribe for the user would be accepted right now; it can still fill up before then"""
+        with self._lock:
+            return (len(self._subscribers.get(user_id, ())) < self.max_per_user
+                    and self._connections < self.max_connections)
+
+    def subscribe(self, user_id: str) -> Optional[Subscription]:
+        """A new subscription, or None when the user or this process is at its connection limit"""
+        subscription = Subscription(user_id, self.max_pending)
+        with self._lock:
+            subscribers = self._subscribers.setdefault(user_id, set())
+            if len(subscribers) >= self.max_per_user or self._connections >= self.max_connections:
+                if not subscribers:
+                    del self._subscribers[user_id]
+                return None
+            subscribers.add(subscription)
+            self._connections += 1
+            if not self._thread:
+                # Start tailing the outbox from now; older events are only replayed on request
+                self._last_seq = self.store.last_delivery_seq()
+                self._thread = Thread(target=self._relay, name="notification-relay", daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers and subscription in subscribers:
+                subscribers.discard(subscription)
+                self._connections -= 1
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    def publish(self, user_id: str, seq: int, event: dict):
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for subscription in subscribers:
+            subscription.push(seq, event)
+
+    def replay(self, user_id: str, after_seq: int):
+        """Events a reconnecting client missed, for the Last-Event-ID it sent"""
+        return [(seq, event) for seq, _, event in self.store.deliveries_since(after_seq, user_id=user_id)]
+
+    @staticmethod
+    def format_event(seq: int, event: dict) -> str:
+        return f"id: {seq}\nevent: reminder\ndata: {json.dumps(event)}\n\n"
+
+    def stop(self):
+        self._stopped.set()
+
+    def _relay(self):
+        while not self._stopped.wait(self.poll_interval):
+            try:
+                rows = self.store.deliveries_since(self._last_seq)
+            except Exception as e:
+                self.logger.error(f"Failed to read notification deliveries: {str(e)}")
+                continue
+            for seq, user_id, event in rows:
+                self._last_seq = seq
+                self.publish(user_id, seq, event)
@@ -1,76 +1,78 @@
-import schedule
-import time
-from threading import Thread
-from datetime import datetime, timedelta
-from utils.firebase_client import FirebaseClient
+from datetime import datetime, time
+from config import Config
+from services.notification_scheduler import Reminder
+from services.notification_store import NotificationStore
+from utils.storage import StorageBackend
+from utils.notification_log_writer import NotificationLogWriter
 import os
-from plyer import notification
+
+# When reminders for each part of the day are sent
+NOTIFY_TIMES = {
+    "morning": time(8, 0),
+    "afternoon": time(13, 0),
+    "evening": time(18, 0)
+}
 
 class NotificationManager:
-    def __init__(self):
-        self.firebase_client = FirebaseClient()
-        self.running = False
-        self.thread = None
+    """
+    Web workers only record reminders in the persistent NotificationStore; they
+    run no scheduler threads. Delivery happens in the notification worker
+    process (python -m services.notification_worker) that holds the scheduler lease.
+    """
+    
+    def __init__(self, storage: StorageBackend, store: NotificationStore = None):
+        self.storage = storage
+        self.store = store or NotificationStore(Config.NOTIFICATION_DB_PATH)
+        self.log_writer = NotificationLogWriter(
+            self.storage,
+            batch_size=Config.NOTIFICATION_LOG_BATCH_SIZE,
+            flush_interval_ms=Config.NOTIFICATION_LOG_FLUSH_MS,
+            max_pending=Config.NOTIFICATION_LOG_MAX_PENDING
+        )
     
     def schedule_notifications(self, recovery_plan):
-        # Clear any existing notifications
-        schedule.clear()
-        
-        # Schedule notifications for each activity in the plan
-        current_date = recovery_plan.start_date
-        end_date = recovery_plan.end_date
+        # Replaces any reminders already scheduled for this plan only
+        reminders = []
+        for current_date, activities in recovery_plan.daily_activities.items():
+            if not recovery_plan.start_date <= current_date <= recovery_plan.end_date:
+                continue
+            for activity in activities:
+                # Determine notification time based on activity time
+                notify_time = NOTIFY_TIMES.get(activity.time, NOTIFY_TIMES["evening"])
+                reminders.append(Reminder(
+                    fire_time=datetime.combine(current_date, notify_time).timestamp(),
+                    plan_id=recovery_plan.plan_id,
+                    activity_id=activity.id,
+                    date=current_date.strftime('%Y-%m-%d'),
+                    title=f"Recovery Activity: {activity.activity_type}",
+                    message=activity.description,
+                    user_id=recovery_plan.user_id
+                ))
         
-        while current_date <= end_date:
-            if current_date in recovery_plan.daily_activities:
-                for activity in recovery_plan.daily_activities[current_date]:
-                    # Determine notification time based on activity time
-                    if activity.time == "morning":
-                        notify_time = "08:00"
-                    elif activity.time == "afternoon":
-                        notify_time = "13:00"
-                    else:  # evening
-                        notify_time = "18:00"
-                    
-                    # Schedule the notification
-                    schedule.every().day.at(notify_time).do(
-                        self.send_notification,
-                        title=f"Recovery Activity: {activity.activity_type}",
-                        message=activity.description,
-                        plan_id=recovery_plan.plan_id,
-                        date=current_date.strftime('%Y-%m-%d'),
-                        activity_id=activity.id
-                    )
-            
-            current_date += timedelta(days=1)
-        
-        # Start the scheduler in a separate thread if not already running
-        if not self.running:
-            self.running = True
-            self.thread = Thread(target=self.run_scheduler)
-            self.thread.start()
+        self.store.replace_plan(recovery_plan.plan_id, reminders)
     
-    def send_notification(self, title, message, plan_id, date, activity_id):
-        # Send desktop notification
-        notification.notify(
-            title=title,
-            message=message,
-            app_name="Medical Recovery Planner"
-        )
+    def cancel_notifications(self, plan_id: str):
+        self.store.cancel_plan(plan_id)
+    
+    def send_notification(self, title, message, plan_id, date, activity_id, user_id=None):
+        # Push to the user's browsers; web workers relay the outbox over /notifications/stream
+        if user_id:
+            self.store.record_delivery(user_id, {
+                'title': title,
+                'message': message,
+                'plan_id': plan_id,
+                'date': date,
+                'activity_id': activity_id
+            })
         
-        # Log the notification in Firebase
-        self.firebase_client.log_notification(
+        # Log the notification in storage; written in batches off the delivery thread
+        self.log_writer.log(
             plan_id=plan_id,
             date=date,
             activity_id=activity_id,
             timestamp=datetime.now()
         )
     
-    def run_scheduler(self):
-        while self.running:
-            schedule.run_pending()
-            time.sleep(1)
-    
-    def stop(self):
-        self.running = False
-        if self.thread:
-            self.thread.join()
\ No newline at end of file
+    def close(self):
+        """Flush notification logs that are still buffered"""
+        self.log_writer.close()
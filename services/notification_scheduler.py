@@ -0,0 +1,138 @@
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from threading import Condition, Thread
+from typing import Callable, Dict, List
+
+class Reminder:
+    __slots__ = ('fire_time', 'plan_id', 'activity_id', 'date', 'title', 'message', 'user_id')
+
+    def __init__(self, fire_time: float, plan_id: str, activity_id: str, date: str, title: str, message: str,
+                 user_id: str = None):
+        self.fire_time = fire_time  # unix timestamp
+        self.plan_id = plan_id
+        self.activity_id = activity_id
+        self.date = date
+        self.title = title
+        self.message = message
+        self.user_id = user_id
+
+class NotificationScheduler:
+    """
+    One-shot reminder timer for many plans at once.
+
+    The heap holds a single (fire_time, plan_id, activity_id) entry per plan:
+    the plan's next pending reminder. Firing it pushes that plan's following
+    reminder, so heap size and per-operation cost depend on the number of
+    active plans, not on how many days they span. Rescheduling or cancelling a
+    plan changes or drops its generation, which turns its old heap entry into
+    a no-op. The worker thread sleeps until the earliest deadline or until an
+    earlier one is inserted.
+    """
+
+    def __init__(self, handler: Callable[[Reminder], None], clock: Callable[[], float] = time.time):
+        self.handler = handler
+        self.clock = clock
+        self.logger = logging.getLogger(__name__)
+        self._condition = Condition()
+        self._heap = []  # (fire_time, seq, plan_id, activity_id, generation)
+        self._pending: Dict[str, deque] = {}  # plan id -> reminders in fire order
+        self._generations: Dict[str, int] = {}
+        self._seq = itertools.count()
+        self._running = False
+        self._thread = None
+
+    def schedule_plan(self, plan_id: str, reminders: List[Reminder]):
+        """Replace every pending reminder of a plan; reminders already due are dropped"""
+        now = self.clock()
+        upcoming = deque(sorted((r for r in reminders if r.fire_time >= now), key=lambda r: r.fire_time))
+        with self._condition:
+            if upcoming:
+                self._pending[plan_id] = upcoming
+                self._generations[plan_id] = next(self._seq)
+                self._push_next(plan_id)
+            else:
+                self._pending.pop(plan_id, None)
+                self._generations.pop(plan_id, None)
+            self._compact()
+            self._condition.notify()
+
+    def cancel_plan(self, plan_id: str):
+        with self._condition:
+            self._pending.pop(plan_id, None)
+            self._generations.pop(plan_id, None)
+            self._compact()
+
+    def pending_count(self, plan_id: str = None) -> int:
+        with self._condition:
+            if plan_id is not None:
+                return len(self._pending.get(plan_id, ()))
+            return sum(len(reminders) for reminders in self._pending.values())
+
+    def start(self):
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+        self._thread = Thread(target=self._run, name="notification-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _push_next(self, plan_id: str):
+        # Must be called with self._condition held
+        reminder = self._pending[plan_id][0]
+        heapq.heappush(self._heap, (reminder.fire_time, next(self._seq), plan_id,
+                                    reminder.activity_id, self._generations[plan_id]))
+
+    def _compact(self):
+        # Must be called with self._condition held. Drops stale entries once they outnumber live ones.
+        if len(self._heap) <= 2 * len(self._generations) + 64:
+            return
+        self._heap = [entry for entry in self._heap if entry[4] == self._generations.get(entry[2])]
+        heapq.heapify(self._heap)
+
+    def _pop_due(self) -> List[Reminder]:
+        # Must be called with self._condition held
+        due = []
+        now = self.clock()
+        while self._heap and self._heap[0][0] <= now:
+            _, _, plan_id, _, generation = heapq.heappop(self._heap)
+            if generation != self._generations.get(plan_id):
+                continue  # cancelled or rescheduled since this entry was pushed
+
+            reminders = self._pending[plan_id]
+            due.append(reminders.popleft())
+            if reminders:
+                self._push_next(plan_id)
+            else:
+                del self._pending[plan_id]
+                del self._generations[plan_id]
+        return due
+
+    def _run(self):
+        while True:
+            with self._condition:
+                due = []
+                while self._running and not due:
+                    due = self._pop_due()
+                    if due:
+                        break
+                    timeout = self._heap[0][0] - self.clock() if self._heap else None
+                    self._condition.wait(timeout)
+                if not self._running:
+                    return
+
+            for reminder in due:
+                try:
+                    self.handler(reminder)
+                except Exception as e:
+                    self.logger.error(f"Failed to deliver reminder {reminder.activity_id}: {str(e)}")
@@ -0,0 +1,187 @@
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+from services.notification_scheduler import Reminder
+
+PENDING = 0
+SENT = 1
+EXPIRED = 2
+
+class NotificationStore:
+    """
+    Pending reminders persisted in SQLite so they survive restarts and can be
+    shared by every web worker on the host. Workers only write reminders here;
+    the single process holding the scheduler lease delivers them, recording
+    each delivery in an outbox that the web workers relay to browsers.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS reminders (
+                    plan_id TEXT NOT NULL,
+                    activity_id TEXT NOT NULL,
+                    fire_time REAL NOT NULL,
+                    date TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    message TEXT NOT NULL,
+                    state INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (plan_id, activity_id)
+                );
+                CREATE INDEX IF NOT EXISTS idx_reminders_pending ON reminders (state, fire_time);
+                CREATE TABLE IF NOT EXISTS plan_changes (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    plan_id TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS leases (
+                    name TEXT PRIMARY KEY,
+                    holder TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS deliveries (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_deliveries_user ON deliveries (user_id, seq);
+            """)
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(reminders)")]
+            if 'user_id' not in columns:
+                # Databases created before reminders were pushed to browsers
+                conn.execute("ALTER TABLE reminders ADD COLUMN user_id TEXT")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    # Writes from web workers
+    def replace_plan(self, plan_id: str, reminders: List[Reminder]):
+        """Replace a plan's pending reminders and record the change for the scheduler"""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM reminders WHERE plan_id = ? AND state = ?", (plan_id, PENDING))
+            conn.executemany(
+                "INSERT OR IGNORE INTO reminders (plan_id, activity_id, fire_time, date, title, message, user_id) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(r.plan_id, r.activity_id, r.fire_time, r.date, r.title, r.message, r.user_id)
+                 for r in reminders]
+            )
+            conn.execute("INSERT INTO plan_changes (plan_id) VALUES (?)", (plan_id,))
+
+    def cancel_plan(self, plan_id: str):
+        self.replace_plan(plan_id, [])
+
+    # Reads and state changes for the scheduler process
+    def last_change_seq(self) -> int:
+        with self._connect() as conn:
+            row = conn.execute("SELECT MAX(seq) FROM plan_changes").fetchone()
+        return row[0] or 0
+
+    def changes_since(self, seq: int) -> Tuple[int, List[str]]:
+        """Plans changed after seq, and the sequence number to poll from next"""
+        with self._transaction() as conn:
+            rows = conn.execute("SELECT seq, plan_id FROM plan_changes WHERE seq > ? ORDER BY seq",
+                                (seq,)).fetchall()
+            if rows:
+                seq = rows[-1][0]
+                # Only the lease holder polls, and a new holder rehydrates from scratch
+                conn.execute("DELETE FROM plan_changes WHERE seq <= ?", (seq,))
+        return seq, list(dict.fromkeys(plan_id for _, plan_id in rows))
+
+    def pending_by_plan(self, until: float, plan_ids: List[str] = None) -> Dict[str, List[Reminder]]:
+        """Pending reminders due before until, grouped by plan"""
+        query = ("SELECT fire_time, plan_id, activity_id, date, title, message, user_id FROM reminders "
+                 "WHERE state = ? AND fire_time < ?")
+        params = [PENDING, until]
+        if plan_ids is not None:
+            query += f" AND plan_id IN ({', '.join('?' for _ in plan_ids)})"
+            params.extend(plan_ids)
+
+        by_plan = {plan_id: [] for plan_id in plan_ids or []}
+        with self._connect() as conn:
+            for row in conn.execute(query, params):
+                by_plan.setdefault(row[1], []).append(Reminder(*row))
+        return by_plan
+
+    def expire_before(self, cutoff: float) -> int:
+        """Give up on pending reminders that are too old to be worth sending"""
+        with self._transaction() as conn:
+            cursor = conn.execute("UPDATE reminders SET state = ? WHERE state = ? AND fire_time < ?",
+                                  (EXPIRED, PENDING, cutoff))
+        return cursor.rowcount
+
+    def claim(self, plan_id: str, activity_id: str) -> bool:
+        """Mark a reminder sent; only the first caller gets True, so it is delivered at most once"""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE reminders SET state = ? WHERE plan_id = ? AND activity_id = ? AND state = ?",
+                (SENT, plan_id, activity_id, PENDING)
+            )
+        return cursor.rowcount == 1
+
+    # Delivery outbox, relayed to connected browsers by each web worker
+    def record_delivery(self, user_id: str, event: dict):
+        with self._transaction() as conn:
+            conn.execute("INSERT INTO deliveries (user_id, payload, created_at) VALUES (?, ?, ?)",
+                         (user_id, json.dumps(event), time.time()))
+
+    def last_delivery_seq(self) -> int:
+        with self._connect() as conn:
+            row = conn.execute("SELECT MAX(seq) FROM deliveries").fetchone()
+        return row[0] or 0
+
+    def deliveries_since(self, seq: int, user_id: str = None, limit: int = 1000) -> List[Tuple[int, str, dict]]:
+        """(seq, user_id, event) rows after seq, oldest first"""
+        query = "SELECT seq, user_id, payload FROM deliveries WHERE seq > ?"
+        params = [seq]
+        if user_id is not None:
+            query += " AND user_id = ?"
+            params.append(user_id)
+        query += " ORDER BY seq LIMIT ?"
+        params.append(limit)
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [(row[0], row[1], json.loads(row[2])) for row in rows]
+
+    def prune_deliveries(self, cutoff: float):
+        """Forget deliveries too old to be replayed to reconnecting browsers"""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM deliveries WHERE created_at < ?", (cutoff,))
+
+    def acquire_lease(self, name: str, holder: str, ttl: float) -> bool:
+        """Take or renew a named lease; fails while another holder's lease is unexpired"""
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT holder, expires_at FROM leases WHERE name = ?", (name,)).fetchone()
+            if row and row[0] != holder and row[1] > now:
+                return False
+            conn.execute("INSERT OR REPLACE INTO leases (name, holder, expires_at) VALUES (?, ?, ?)",
+                         (name, holder, now + ttl))
+        return True
+
+    def release_lease(self, name: str, holder: str):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM leases WHERE name = ? AND holder = ?", (name, holder))
@@ -0,0 +1,109 @@
+import logging
+import os
+import signal
+import socket
+import time
+import uuid
+from threading import Event
+from config import Config
+from services.notification_manager import NotificationManager
+from services.notification_scheduler import NotificationScheduler, Reminder
+from services.notification_store import NotificationStore
+from utils.storage import create_storage
+
+LEASE_NAME = "notification-scheduler"
+
+class NotificationWorker:
+    """
+    Standalone reminder delivery process. Any number may run; the one holding
+    the scheduler lease loads upcoming reminders from the NotificationStore into
+    a NotificationScheduler, delivers them and follows changes written by the
+    web workers. The others wait to take over when the lease expires.
+    """
+
+    def __init__(self, store: NotificationStore, notification_manager: NotificationManager):
+        self.store = store
+        self.notification_manager = notification_manager
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.logger = logging.getLogger(__name__)
+        self.scheduler = None
+        self._stopped = Event()
+        self._change_seq = 0
+        self._horizon_end = 0
+
+    def run(self):
+        while not self._stopped.is_set():
+            if self.store.acquire_lease(LEASE_NAME, self.holder, Config.NOTIFICATION_LEASE_SECONDS):
+                if not self.scheduler:
+                    self._become_leader()
+                self._poll()
+            elif self.scheduler:
+                self.logger.warning("Lost the scheduler lease, stopping delivery")
+                self._step_down()
+            self._stopped.wait(Config.NOTIFICATION_POLL_SECONDS)
+
+        if self.scheduler:
+            self._step_down()
+            self.store.release_lease(LEASE_NAME, self.holder)
+        self.notification_manager.close()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _become_leader(self):
+        self.logger.info(f"Acquired the scheduler lease as {self.holder}")
+        self.scheduler = NotificationScheduler(self._deliver)
+        # Read the change position first so changes made while loading are picked up by the next poll
+        self._change_seq = self.store.last_change_seq()
+        self._horizon_end = 0
+        self.scheduler.start()
+
+    def _step_down(self):
+        self.scheduler.stop()
+        self.scheduler = None
+
+    def _poll(self):
+        now = time.time()
+        self._catch_up(now)
+        self.store.prune_deliveries(now - Config.NOTIFICATION_REPLAY_SECONDS)
+
+        self._change_seq, changed_plans = self.store.changes_since(self._change_seq)
+        if now + Config.NOTIFICATION_LOAD_HORIZON_SECONDS / 2 >= self._horizon_end:
+            # Only reminders inside the horizon are held in memory; extend it before it runs out
+            self._horizon_end = now + Config.NOTIFICATION_LOAD_HORIZON_SECONDS
+            self._load(self.store.pending_by_plan(self._horizon_end))
+        elif changed_plans:
+            self._load(self.store.pending_by_plan(self._horizon_end, plan_ids=changed_plans))
+
+    def _catch_up(self, now: float):
+        """Send reminders missed while no scheduler was running, unless they are too old to matter"""
+        expired = self.store.expire_before(now - Config.NOTIFICATION_CATCHUP_SECONDS)
+        if expired:
+            self.logger.info(f"Expired {expired} reminders missed by more than the catch-up window")
+        for reminders in self.store.pending_by_plan(now).values():
+            for reminder in reminders:
+                self._deliver(reminder)
+
+    def _load(self, reminders_by_plan):
+        for plan_id, reminders in reminders_by_plan.items():
+            self.scheduler.schedule_plan(plan_id, reminders)
+
+    def _deliver(self, reminder: Reminder):
+        if not self.store.claim(reminder.plan_id, reminder.activity_id):
+            return  # already delivered, or the plan was rescheduled
+        self.notification_manager.send_notification(
+            title=reminder.title,
+            message=reminder.message,
+            plan_id=reminder.plan_id,
+            date=reminder.date,
+            activity_id=reminder.activity_id,
+            user_id=reminder.user_id
+        )
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    store = NotificationStore(Config.NOTIFICATION_DB_PATH)
+    worker = NotificationWorker(store, NotificationManager(create_storage(), store))
+    signal.signal(signal.SIGINT, lambda *args: worker.stop())
+    signal.signal(signal.SIGTERM, lambda *args: worker.stop())
+    worker.run()
@@ -0,0 +1,110 @@
+import logging
+import re
+from typing import List
+from services.rule_based_analyzer import LAB_LINE_PATTERN
+from utils.nlp_processor import NLPProcessor
+
+# Rough size of a Gemini token in characters of English/lab text
+CHARS_PER_TOKEN = 4
+
+# Reference intervals and H/L flags that accompany result rows
+RESULT_HINT_PATTERN = re.compile(r'\b(?:reference|ref\.? range|normal range|result|units?)\b|\(\s*\d+(?:\.\d+)?\s*-\s*\d+|\s[HL]\s*$',
+                                 re.IGNORECASE)
+
+# Boilerplate that never carries results: contact details, page furniture, disclaimers
+NOISE_PATTERN = re.compile(
+    r'@|https?://|www\.|\bpage \d+ of \d+\b|\b(?:tel|phone|fax)\b|\bdisclaimer\b|\bconfidential\b'
+    r'|\ball rights reserved\b|\bthis report\b.*\b(?:intended|substitute|advice)\b',
+    re.IGNORECASE
+)
+
+class ReportPromptBuilder:
+    """
+    Cuts a report down to the parts Gemini needs before it goes into the
+    prompt: rows mentioning a known test, a deficiency term or a measurement
+    with a unit, plus a line of context around each, within a token budget.
+    Repeated lines (per-page headers and footers) are kept once.
+    """
+
+    def __init__(self, nlp_processor: NLPProcessor, token_budget: int, context_lines: int = 1):
+        self.nlp_processor = nlp_processor
+        self.token_budget = token_budget
+        self.context_lines = context_lines
+        self.logger = logging.getLogger(__name__)
+
+    def build(self, report_content: str) -> str:
+        lines = self._unique_lines(report_content)
+        scores = self._score_lines(lines)
+
+        selected = self._select(lines, scores)
+        if not selected:
+            # Nothing looks like a result; send the start of the report rather than nothing
+            selected = self._fit(lines, range(len(lines)))
+        content = "\n".join(lines[i] for i in selected)
+
+        original_tokens = self.estimate_tokens(report_content)
+        kept_tokens = self.estimate_tokens(content)
+        if original_tokens:
+            self.logger.info(f"Report prompt content: {kept_tokens} of ~{original_tokens} tokens "
+                             f"({1 - kept_tokens / original_tokens:.0%} removed, {len(selected)}/{len(lines)} lines)")
+        return content
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+    @staticmethod
+    def _unique_lines(report_content: str) -> List[str]:
+        seen = set()
+        lines = []
+        for line in report_content.splitlines():
+            line = line.strip()
+            key = re.sub(r'\s+', ' ', line.lower())
+            if line and key not in seen:
+                seen.add(key)
+                lines.append(line)
+        return lines
+
+    def _score_lines(self, lines: List[str]) -> List[int]:
+        scores = []
+        for line, (test, deficiency) in zip(lines, self.nlp_processor.line_matches(lines)):
+            score = 3 * test + 2 * deficiency
+            if LAB_LINE_PATTERN.search(line):
+                score += 2
+            elif RESULT_HINT_PATTERN.search(line):
+                score += 1
+            if NOISE_PATTERN.search(line) and not test:
+                score = 0
+            scores.append(score)
+        return scores
+
+    def _select(self, lines: List[str], scores: List[int]) -> List[int]:
+        # Each relevant line brings its context; higher-scoring groups claim the budget first
+        groups = []
+        for index, score in enumerate(scores):
+            if score:
+                first = max(0, index - self.context_lines)
+                last = min(len(lines), index + self.context_lines + 1)
+                groups.append((score, index, range(first, last)))
+        groups.sort(key=lambda group: (-group[0], group[1]))
+
+        chosen = set()
+        used = 0
+        for _, _, group in groups:
+            added = [i for i in group if i not in chosen]
+            cost = sum(self.estimate_tokens(lines[i]) + 1 for i in added)
+            if used + cost > self.token_budget:
+                continue
+            chosen.update(added)
+            used += cost
+        return sorted(chosen)
+
+    def _fit(self, lines: List[str], indices) -> List[int]:
+        kept: List[int] = []
+        used = 0
+        for i in indices:
+            used += self.estimate_tokens(lines[i]) + 1
+            if used > self.token_budget:
+                break
+            kept.append(i)
+        return kept
@@ -0,0 +1,220 @@
+import numpy as np
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+from models.deficiency import Deficiency
+
+def normalize_unit(unit: Optional[str]) -> Optional[str]:
+    if not unit:
+        return None
+    return unit.replace('μ', 'u').replace('µ', 'u').replace('mcg', 'ug').lower()
+
+class ReferenceRange:
+    """Adult reference range for one test, in its canonical unit, plus conversions from other units"""
+
+    def __init__(self, name: str, unit: str, low: float, high: float,
+                 conversions: Dict[str, float] = None, plausible: Tuple[float, float] = None):
+        self.name = name
+        self.unit = unit
+        self.low = low
+        self.high = high
+        self.conversions = {normalize_unit(unit): 1.0}  # unit -> factor to the canonical unit
+        for other, factor in (conversions or {}).items():
+            self.conversions[normalize_unit(other)] = factor
+        self.plausible = plausible or (0, high * 5)  # values outside this are read errors
+
+    @property
+    def normal_range(self) -> str:
+        return f"{self.low:g}-{self.high:g} {self.unit}"
+
+    @property
+    def border_margin(self) -> float:
+        # Values within 10% of the range width above the lower limit are borderline
+        return (self.high - self.low) * 0.1
+
+# Keys are the lower-cased test names NLPProcessor matches
+REFERENCE_RANGES = {
+    'vitamin d': ReferenceRange("Vitamin D", "ng/mL", 30, 100, {'nmol/L': 0.4}, (1, 250)),
+    'vitamin b12': ReferenceRange("Vitamin B12", "pg/mL", 200, 900, {'pmol/L': 1.355, 'ng/L': 1.0}, (20, 5000)),
+    'iron': ReferenceRange("Iron", "ug/dL", 60, 170, {'umol/L': 5.585}, (5, 500)),
+    'hemoglobin': ReferenceRange("Hemoglobin", "g/dL", 12.0, 17.5, {'g/L': 0.1, 'mmol/L': 1.611}, (3, 25)),
+    'calcium': ReferenceRange("Calcium", "mg/dL", 8.5, 10.5, {'mmol/L': 4.008}, (3, 20)),
+    'magnesium': ReferenceRange("Magnesium", "mg/dL", 1.7, 2.2, {'mmol/L': 2.431, 'mEq/L': 1.215}, (0.3, 8)),
+    'potassium': ReferenceRange("Potassium", "mmol/L", 3.5, 5.0, {'mEq/L': 1.0}, (1, 10)),
+    'sodium': ReferenceRange("Sodium", "mmol/L", 135, 145, {'mEq/L': 1.0}, (90, 200)),
+}
+
+DEFAULT_BAND = 'adult'
+CHILD_MAX_AGE = 17
+
+def reference_band(sex: Optional[str] = None, age: Optional[int] = None) -> str:
+    """Band whose ranges apply to a patient; unknown sex or age falls back to the adult ranges"""
+    if age is not None and age <= CHILD_MAX_AGE:
+        return 'child'
+    sex = (sex or '').strip().lower()
+    if sex in ('male', 'female'):
+        return sex
+    return DEFAULT_BAND
+
+# Ranges that differ by sex or age; anything not listed here uses REFERENCE_RANGES
+BAND_RANGES = {
+    ('hemoglobin', 'male'): ReferenceRange("Hemoglobin", "g/dL", 13.5, 17.5, {'g/L': 0.1, 'mmol/L': 1.611}, (3, 25)),
+    ('hemoglobin', 'female'): ReferenceRange("Hemoglobin", "g/dL", 12.0, 15.5, {'g/L': 0.1, 'mmol/L': 1.611}, (3, 25)),
+    ('hemoglobin', 'child'): ReferenceRange("Hemoglobin", "g/dL", 11.0, 15.5, {'g/L': 0.1, 'mmol/L': 1.611}, (3, 25)),
+    ('iron', 'male'): ReferenceRange("Iron", "ug/dL", 65, 175, {'umol/L': 5.585}, (5, 500)),
+    ('iron', 'female'): ReferenceRange("Iron", "ug/dL", 50, 170, {'umol/L': 5.585}, (5, 500)),
+    ('iron', 'child'): ReferenceRange("Iron", "ug/dL", 50, 120, {'umol/L': 5.585}, (5, 500)),
+}
+
+# Row status codes
+UNREADABLE, NORMAL, BORDERLINE, DEFICIENT, HIGH = range(5)
+STATUS_NAMES = [None, 'normal', 'borderline', 'deficient', 'high']
+SEVERITIES = ["low", "medium", "high"]
+
+class RowEvaluation:
+    """Per-row results of one RangeEvaluator.evaluate call, as parallel arrays"""
+
+    def __init__(self, reports: Sequence[Hashable], values: np.ndarray, status: np.ndarray,
+                 severity: np.ndarray, confidence: np.ndarray, reference_index: np.ndarray,
+                 raw_values: Sequence[str], evaluator: 'RangeEvaluator'):
+        self.reports = reports  # report key per row
+        self.values = values  # in each test's canonical unit, NaN when unreadable
+        self.status = status
+        self.severity = severity  # index into SEVERITIES
+        self.confidence = confidence
+        self.reference_index = reference_index  # row -> evaluator.references, -1 for unknown tests
+        self.raw_values = raw_values
+        self.evaluator = evaluator
+
+    def deficiency(self, row: int) -> Deficiency:
+        reference = self.reference_index[row]
+        return Deficiency(
+            name=self.evaluator.names[reference],
+            current_value=self.raw_values[row],
+            normal_range=self.evaluator.normal_ranges[reference],
+            severity=SEVERITIES[self.severity[row]],
+            is_border_value=bool(self.status[row] == BORDERLINE)
+        )
+
+    def deficiencies_by_report(self) -> Dict[Hashable, List[Deficiency]]:
+        """Deficiency objects are only built for flagged rows"""
+        result = {report: [] for report in dict.fromkeys(self.reports)}
+        flagged = np.flatnonzero((self.status == DEFICIENT) | (self.status == BORDERLINE))
+        names = self.evaluator.names
+        normal_ranges = self.evaluator.normal_ranges
+        for row, reference, severity, status in zip(flagged.tolist(),
+                                                    self.reference_index[flagged].tolist(),
+                                                    self.severity[flagged].tolist(),
+                                                    self.status[flagged].tolist()):
+            result[self.reports[row]].append(Deficiency(
+                name=names[reference],
+                current_value=self.raw_values[row],
+                normal_range=normal_ranges[reference],
+                severity=SEVERITIES[severity],
+                is_border_value=status == BORDERLINE
+            ))
+        return result
+
+class RangeEvaluator:
+    """
+    Evaluates batches of (report, test, value, unit, band) rows against the
+    reference ranges with array operations: unit normalization, range lookup
+    by sex/age band, severity banding and borderline detection. Strings are
+    only normalized once per distinct test, unit and band in a batch; every
+    row after that is integer codes and float arrays.
+    """
+
+    def __init__(self, reference_ranges: Dict[str, ReferenceRange] = None,
+                 band_ranges: Dict[Tuple[str, str], ReferenceRange] = None):
+        reference_ranges = reference_ranges or REFERENCE_RANGES
+        band_ranges = BAND_RANGES if band_ranges is None else band_ranges
+
+        self.tests = list(reference_ranges)
+        self.test_codes = {test: code for code, test in enumerate(self.tests)}
+        self.bands = [DEFAULT_BAND] + sorted({band for _, band in band_ranges} - {DEFAULT_BAND})
+        self.band_codes = {band: code for code, band in enumerate(self.bands)}
+
+        # (test, band) -> reference, falling back to the test's default range
+        self.references = []
+        for test in self.tests:
+            for band in self.bands:
+                self.references.append(band_ranges.get((test, band), reference_ranges[test]))
+        self.names = [r.name for r in self.references]
+        self.normal_ranges = [r.normal_range for r in self.references]
+        self.low = np.array([r.low for r in self.references], dtype=np.float64)
+        self.high = np.array([r.high for r in self.references], dtype=np.float64)
+        self.margin = np.array([r.border_margin for r in self.references], dtype=np.float64)
+        self.plausible_low = np.array([r.plausible[0] for r in self.references], dtype=np.float64)
+        self.plausible_high = np.array([r.plausible[1] for r in self.references], dtype=np.float64)
+
+        # test x unit conversion factors; the last two columns are "no unit" (taken as canonical)
+        # and "unknown unit", and the last row is for unknown tests
+        units = sorted({unit for r in self.references for unit in r.conversions})
+        self.unit_codes = {unit: code for code, unit in enumerate(units)}
+        self.no_unit = len(units)
+        self.unknown_unit = len(units) + 1
+        self.factors = np.full((len(self.tests) + 1, len(units) + 2), np.nan)
+        for code, test in enumerate(self.tests):
+            for unit, factor in reference_ranges[test].conversions.items():
+                self.factors[code, self.unit_codes[unit]] = factor
+            self.factors[code, self.no_unit] = 1.0
+
+    def evaluate(self, reports: Sequence[Hashable], tests: Sequence[str], values: Sequence[float],
+                 units: Sequence[str], bands: Sequence[str] = None, raw_values: Sequence[str] = None) -> RowEvaluation:
+        count = len(tests)
+        values = np.asarray(values, dtype=np.float64)
+        test_codes = self._encode(tests, lambda test: self.test_codes.get(str(test).strip().lower(), -1), count)
+        unit_codes = self._encode(units, self._unit_code, count)
+        if bands is None:
+            band_codes = np.zeros(count, dtype=np.int64)
+        else:
+            band_codes = self._encode(bands, lambda band: self.band_codes.get(str(band).strip().lower(), 0), count)
+
+        known = test_codes >= 0
+        reference_index = np.where(known, test_codes * len(self.bands) + band_codes, 0)
+        canonical = values * self.factors[test_codes, unit_codes]  # -1 picks the unknown-test row
+
+        low = self.low[reference_index]
+        plausible = (known & ~np.isnan(canonical)
+                     & (canonical >= self.plausible_low[reference_index])
+                     & (canonical <= self.plausible_high[reference_index]))
+
+        status = np.full(count, UNREADABLE, dtype=np.int8)
+        status[plausible] = NORMAL
+        status[plausible & (canonical < low + self.margin[reference_index])] = BORDERLINE
+        status[plausible & (canonical < low)] = DEFICIENT
+        status[plausible & (canonical > self.high[reference_index])] = HIGH
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = canonical / low
+        severity = np.select([ratio >= 0.8, ratio >= 0.5], [0, 1], default=2).astype(np.int8)
+        severity[status == BORDERLINE] = 0
+
+        # Values without a unit are assumed canonical but not trusted; above-range values aren't ours to call
+        confidence = np.where(unit_codes == self.no_unit, 0.5, 1.0)
+        confidence[(status == UNREADABLE) | (status == HIGH)] = 0.0
+
+        if raw_values is None:
+            raw_values = _LazyRawValues(values, units)
+        return RowEvaluation(reports, np.where(plausible, canonical, np.nan), status, severity, confidence,
+                             np.where(known, reference_index, -1), raw_values, self)
+
+    def _unit_code(self, unit: Optional[str]) -> int:
+        unit = normalize_unit(unit)
+        if unit is None:
+            return self.no_unit
+        return self.unit_codes.get(unit, self.unknown_unit)
+
+    @staticmethod
+    def _encode(items: Sequence, to_code, count: int) -> np.ndarray:
+        """Integer code per row, normalizing each distinct string only once"""
+        memo = {item: to_code(item) for item in set(items)}
+        return np.fromiter(map(memo.__getitem__, items), dtype=np.int64, count=count)
+
+class _LazyRawValues:
+    """Display strings for rows given as numbers, formatted only for the rows that get a Deficiency"""
+
+    def __init__(self, values: np.ndarray, units: Sequence[str]):
+        self.values = values
+        self.units = units
+
+    def __getitem__(self, row: int) -> str:
+        return f"{self.values[row]:g} {self.units[row] or ''}".strip()
@@ -4,37 +4,151 @@ from langchain_community.llms import GooglePalm
 from models.deficiency import Deficiency
 from utils.gemini_client import GeminiClient
 import re
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 import os
 from config import Config
 from utils.nlp_processor import NLPProcessor
+from services.rule_based_analyzer import LAB_LINE_PATTERN, RuleBasedAnalyzer
+from services.range_evaluator import DEFAULT_BAND
+from services.prompt_builder import ReportPromptBuilder
+from utils.analysis_cache import AnalysisCache
+from utils.extraction_cache import ExtractionCache
+from utils.pdf_extractor import PdfTextExtractor
+from utils.text_reader import DecodedText, read_text_file
+from models.medical_report import MedicalReport
+from models.extracted_content import ExtractedContent
 from dotenv import load_dotenv
 import logging
 
 load_dotenv()
 
 class ReportAnalyzer:
-    def __init__(self):
-        self.gemini_client = GeminiClient()
+    # Bump whenever the deficiency prompt, its parsing or the local rules change so cached analyses are redone
+    PROMPT_VERSION = "deficiency-v4"
+    # Bump whenever text extraction, normalization or NLP matching changes so stored extractions are redone
+    EXTRACTOR_VERSION = "extract-v3"
+
+    def __init__(self, storage=None, gemini_client: GeminiClient = None):
+        self.gemini_client = gemini_client or GeminiClient()
         self.nlp_processor = NLPProcessor()
+        self.rule_analyzer = RuleBasedAnalyzer()
+        self.prompt_builder = ReportPromptBuilder(self.nlp_processor,
+                                                  Config.ANALYSIS_PROMPT_TOKEN_BUDGET,
+                                                  Config.ANALYSIS_PROMPT_CONTEXT_LINES)
+        self.pdf_extractor = PdfTextExtractor(Config.PDF_WORKERS, Config.PDF_BATCH_PAGES,
+                                              Config.PDF_PARALLEL_MIN_PAGES, Config.PDF_MAX_PAGES,
+                                              Config.PDF_MAX_TEXT_BYTES)
+        self.analysis_cache = AnalysisCache(Config.ANALYSIS_CACHE_DIR, Config.ANALYSIS_CACHE_MAX_BYTES)
+        self.analysis_version = f"{self.gemini_client.model_name}:{self.PROMPT_VERSION}"
+        # Extracted text and NLP output are persisted through storage, with hot reports kept in process
+        self.storage = storage
+        self.extraction_cache = ExtractionCache(storage, Config.EXTRACTION_CACHE_MAX_BYTES)
+        self.extractor_version = f"{self.EXTRACTOR_VERSION}:{self.nlp_processor.pipeline}"
         self.logger = logging.getLogger(__name__)
+    
+    def analyze_medical_report(self, report: MedicalReport) -> bool:
+        """
+        Make sure report.deficiencies holds an analysis for the current version.
+        Returns True when the report was updated and needs to be saved.
+        """
+        if self.is_analyzed(report):
+            return False
+        
+        if not report.file_hash:
+            report.file_hash = AnalysisCache.hash_file(report.file_path)
+        report.deficiencies = self.analyze_report(report.file_path, file_hash=report.file_hash,
+                                                  band=report.reference_band, file_type=report.file_type)
+        report.analysis_version = self.version_for(report.reference_band)
+        return True
+    
+    def version_for(self, band: str = None) -> str:
+        """
+        Analysis version for reports in a sex/age band. Local results depend on
+        the band's reference ranges, so analyses are only shared within a band;
+        the default band keeps the plain version.
+        """
+        if not band or band == DEFAULT_BAND:
+            return self.analysis_version
+        return f"{self.analysis_version}:{band}"
+    
+    def is_analyzed(self, report: MedicalReport) -> bool:
+        return report.is_analyzed(self.version_for(report.reference_band))
+    
+    @staticmethod
+    def reader_for(file_path: str, file_type: str = None) -> str:
+        """
+        How a file is read: pdf, docx or text. The same bytes can be uploaded
+        under different names, so the upload's own type wins over the stored path.
+        """
+        if file_type is None:
+            _, file_type = os.path.splitext(file_path)
+        ext = file_type.lower()
+        return {'.pdf': 'pdf', '.docx': 'docx'}.get(ext, 'text')
+        
+    def reuse_analysis(self, report: MedicalReport) -> bool:
+        """
+        Fill in an earlier analysis of the same file content; returns True if
+        there was one. The local cache is checked first, then any stored report
+        with the same file hash, so duplicates handled on another host or after
+        a cache eviction are not analyzed again.
+        """
+        if not report.file_hash:
+            return False
+        analysis_version = self.version_for(report.reference_band)
+        reader = self.reader_for(report.file_path, report.file_type)
+        cache_key = AnalysisCache.make_key(report.file_hash, f"{analysis_version}:{reader}")
+        cached = self.analysis_cache.get(cache_key)
+        if cached is None and self.storage is not None:
+            try:
+                previous = self.storage.find_analyzed_report(report.file_hash, analysis_version)
+            except Exception as e:
+                self.logger.warning(f"Could not look up earlier analyses of {report.file_hash[:12]}: {str(e)}")
+                previous = None
+            # Only reuse an analysis of the file read the same way
+            if previous is not None and self.reader_for(previous.file_path, previous.file_type) == reader:
+                cached = previous.deficiencies
+                self.analysis_cache.put(cache_key, cached)
+        if cached is None:
+            return False
+        report.deficiencies = cached
+        report.analysis_version = analysis_version
+        return True
         
-    def analyze_report(self, file_path: str) -> List[Deficiency]:
+    def analyze_report(self, file_path: str, file_hash: str = None, band: str = DEFAULT_BAND,
+                       file_type: str = None) -> List[Deficiency]:
         """
         Analyze a medical report file and identify deficiencies.
         Supports PDF, DOCX, and text files with multiple encodings.
+        Test results are classified against the reference ranges of the patient's sex/age band.
+        file_type is the uploaded file's extension when it differs from file_path's.
+        Results are cached by file content and band, so identical files are only sent to Gemini once.
         """
         try:
             self.logger.info(f"Starting analysis of file: {file_path}")
             
-            # Get file content based on type
-            report_content = self._extract_file_content(file_path)
+            file_hash = file_hash or AnalysisCache.hash_file(file_path)
+            reader = self.reader_for(file_path, file_type)
+            cache_key = AnalysisCache.make_key(file_hash, f"{self.version_for(band)}:{reader}")
+            cached = self.analysis_cache.get(cache_key)
+            if cached is not None:
+                self.logger.info(f"Analysis cache hit for {file_hash[:12]}")
+                return cached
             
-            # Use NLP to extract key information
-            extracted_data = self.nlp_processor.extract_medical_info(report_content)
+            # Text and NLP output come from the extraction cache unless this file was never parsed
+            extraction = self.get_extraction(file_path, file_hash, file_type)
+            report_content = extraction.text
+            extracted_data = extraction.medical_info
             
-            # Use Gemini to analyze deficiencies
-            deficiencies = self._analyze_with_gemini(report_content)
+            # Routine panels are classified locally; Gemini only sees reports the table can't settle
+            local = self.rule_analyzer.analyze(report_content, extracted_data['test_results'], band)
+            if local.is_conclusive(Config.ANALYSIS_RULES_MIN_CONFIDENCE, Config.ANALYSIS_RULES_MIN_COVERAGE):
+                self.logger.info(f"Analyzed {len(local.readings)} test results locally")
+                deficiencies = local.deficiencies
+            else:
+                self.logger.info(f"Local analysis inconclusive (confidence {local.confidence:.2f}, "
+                                 f"coverage {local.coverage:.2f}), using Gemini")
+                deficiencies = self._analyze_with_gemini(report_content)
+            self.analysis_cache.put(cache_key, deficiencies)
             
             self.logger.info(f"Found {len(deficiencies)} deficiencies")
             return deficiencies
@@ -43,27 +157,52 @@ class ReportAnalyzer:
             self.logger.error(f"Error analyzing report: {str(e)}")
             raise ValueError(f"Failed to analyze report: {str(e)}")
 
-    def _extract_file_content(self, file_path: str) -> str:
-        """Extract text content from different file types"""
-        _, ext = os.path.splitext(file_path.lower())
+    def get_extraction(self, file_path: str, file_hash: str = None, file_type: str = None) -> ExtractedContent:
+        """Normalized text and NLP output for a file, parsing it only if no stored copy exists"""
+        file_hash = file_hash or AnalysisCache.hash_file(file_path)
+        reader = self.reader_for(file_path, file_type)
+        extractor_version = f"{self.extractor_version}:{reader}"
+        extraction = self.extraction_cache.get(ExtractedContent.make_key(file_hash, extractor_version))
+        if extraction is not None:
+            self.logger.info(f"Extraction cache hit for {file_hash[:12]}")
+            return extraction
+        
+        # Get file content based on type
+        text, encoding = self._extract_file_content(file_path, reader)
+        text = self._normalize_text(text)
         
-        if ext == '.pdf':
-            return self._extract_pdf_text(file_path)
-        elif ext == '.docx':
-            return self._extract_docx_text(file_path)
+        # Use NLP to extract key information
+        extraction = ExtractedContent(
+            file_hash=file_hash,
+            extractor_version=extractor_version,
+            text=text,
+            encoding=encoding,
+            medical_info=self.nlp_processor.extract_medical_info(text)
+        )
+        self.extraction_cache.put(extraction)
+        return extraction
+
+    def _extract_file_content(self, file_path: str, reader: str) -> Tuple[str, Optional[str]]:
+        """Extract text content from different file types, with the detected encoding of text files"""
+        if reader == 'pdf':
+            return self._extract_pdf_text(file_path), None
+        elif reader == 'docx':
+            return self._extract_docx_text(file_path), None
         else:  # Assume text file
-            return self._extract_text_file(file_path)
+            decoded = self._extract_text_file(file_path)
+            return decoded.text, decoded.encoding
+
+    @staticmethod
+    def _normalize_text(text: str) -> str:
+        """Strip trailing spaces and NULs and collapse runs of blank lines"""
+        lines = [line.rstrip() for line in text.replace('\x00', '').splitlines()]
+        return re.sub(r'\n{3,}', '\n\n', "\n".join(lines)).strip()
 
     def _extract_pdf_text(self, file_path: str) -> str:
-        """Extract text from PDF files using PyPDF2"""
+        """Extract text from PDF files using PyPDF2, stopping once the lab results are behind us"""
         try:
-            import PyPDF2
-            with open(file_path, 'rb') as file:
-                reader = PyPDF2.PdfReader(file)
-                text = ""
-                for page in reader.pages:
-                    text += page.extract_text() or ""  # Handle None returns
-                return text
+            return self.pdf_extractor.extract(file_path, section_pattern=LAB_LINE_PATTERN,
+                                              stop_after=Config.PDF_STOP_AFTER_PAGES)
         except Exception as e:
             self.logger.error(f"PDF extraction failed: {str(e)}")
             raise ValueError("Failed to extract text from PDF file")
@@ -78,22 +217,20 @@ class ReportAnalyzer:
             self.logger.error(f"DOCX extraction failed: {str(e)}")
             raise ValueError("Failed to extract text from DOCX file")
 
-    def _extract_text_file(self, file_path: str) -> str:
-        """Handle various text file encodings"""
-        encodings = ['utf-8', 'latin-1', 'iso-8859-1', 'cp1252', 'utf-16']
-        for encoding in encodings:
-            try:
-                with open(file_path, 'r', encoding=encoding) as file:
-                    return file.read()
-            except UnicodeDecodeError:
-                continue
-        raise UnicodeDecodeError("Could not decode the text file with any supported encoding")
+    def _extract_text_file(self, file_path: str) -> DecodedText:
+        """Read a text file once, detecting its encoding from a BOM or a sample"""
+        decoded = read_text_file(file_path, Config.TEXT_SAMPLE_BYTES, Config.TEXT_MMAP_MIN_BYTES)
+        self.logger.info(f"Decoded {decoded.size} bytes of text as {decoded.encoding}"
+                         f"{' (memory-mapped)' if decoded.memory_mapped else ''}")
+        return decoded
 
     def _analyze_with_gemini(self, report_content: str) -> List[Deficiency]:
         """Analyze report content using Gemini API"""
+        # Only result rows and their context are sent, not headers, addresses or disclaimers
+        relevant_content = self.prompt_builder.build(report_content)
         prompt = f"""
-        Analyze this medical report and identify all deficiencies and border values:
-        {report_content}
+        Analyze these lines from a medical report and identify all deficiencies and border values:
+        {relevant_content}
         
         For each deficiency found, provide:
         - Name of the deficiency
@@ -117,6 +254,7 @@ class ReportAnalyzer:
         }}
         """
         
+        # Raises GeminiError rather than returning "", so a failed call is never cached as "no deficiencies"
         response = self.gemini_client.generate_text(prompt)
         return self._parse_deficiency_response(response)
     
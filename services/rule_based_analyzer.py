@@ -0,0 +1,103 @@
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+from models.deficiency import Deficiency
+from services.range_evaluator import DEFAULT_BAND, STATUS_NAMES, RangeEvaluator
+
+# Numeric value with an optional unit right after it, e.g. "15", "15.2 ng/mL", "4.1mmol/L"
+VALUE_PATTERN = re.compile(r'^\s*[<>]?\s*(\d+(?:[.,]\d+)?)\s*([a-zA-Zµμ%]+(?:/[a-zA-Z]+)?)?')
+
+# A line that reports some measurement with a unit; used to tell how much of a report the table covers
+LAB_LINE_PATTERN = re.compile(r'[a-zA-Z].*?\d+(?:[.,]\d+)?\s*(?:[a-zA-Zµμ]+/[a-zA-Z]+|mmol|mEq|IU)\b')
+
+class TestReading:
+    """One extracted test result, classified against its reference range"""
+
+    def __init__(self, test: str, raw: str, value: float = None, confidence: float = 0.0,
+                 status: str = None, deficiency: Deficiency = None):
+        self.test = test
+        self.raw = raw
+        self.value = value  # in the reference range's canonical unit
+        self.confidence = confidence
+        self.status = status  # deficient, borderline, normal, high, or None if unreadable
+        self.deficiency = deficiency
+
+class LocalAnalysis:
+    """Outcome of the rule-based pass over a report"""
+
+    def __init__(self, readings: List[TestReading], lab_lines: int):
+        self.readings = readings
+        self.lab_lines = lab_lines
+
+    @property
+    def deficiencies(self) -> List[Deficiency]:
+        return [r.deficiency for r in self.readings if r.deficiency]
+
+    @property
+    def confidence(self) -> float:
+        return min((r.confidence for r in self.readings), default=0.0)
+
+    @property
+    def coverage(self) -> float:
+        """Share of the report's measurement lines that the table accounted for"""
+        if not self.readings:
+            return 0.0
+        return min(1.0, len(self.readings) / max(self.lab_lines, 1))
+
+    def is_conclusive(self, min_confidence: float, min_coverage: float) -> bool:
+        return bool(self.readings) and self.confidence >= min_confidence and self.coverage >= min_coverage
+
+class RuleBasedAnalyzer:
+    """
+    Classifies the test results NLPProcessor extracts against the local
+    reference ranges. Readings without a recognised unit, outside plausible
+    bounds, or above the range (not a deficiency question) get low confidence
+    so the report is left to Gemini.
+    """
+
+    def __init__(self, evaluator: RangeEvaluator = None):
+        self.evaluator = evaluator or RangeEvaluator()
+
+    def analyze(self, report_content: str, test_results: Dict[str, str], band: str = DEFAULT_BAND) -> LocalAnalysis:
+        return self.analyze_many([(report_content, test_results, band)])[0]
+
+    def analyze_many(self, reports: Sequence[Tuple[str, Dict[str, str], str]]) -> List[LocalAnalysis]:
+        """Classify many reports' (content, test_results, band) in one vectorized evaluation"""
+        keys, tests, values, units, bands, raws = [], [], [], [], [], []
+        for index, (_, test_results, band) in enumerate(reports):
+            for test, raw in test_results.items():
+                value, unit = self.parse_value(raw) or (float('nan'), None)
+                keys.append(index)
+                tests.append(test)
+                values.append(value)
+                units.append(unit)
+                bands.append(band or DEFAULT_BAND)
+                raws.append((raw or '').strip())
+
+        evaluation = self.evaluator.evaluate(keys, tests, values, units, bands, raws)
+        readings = [[] for _ in reports]
+        for row, index in enumerate(keys):
+            status = STATUS_NAMES[evaluation.status[row]]
+            readings[index].append(TestReading(
+                test=tests[row],
+                raw=raws[row],
+                value=float(evaluation.values[row]),
+                confidence=float(evaluation.confidence[row]),
+                status=status,
+                deficiency=evaluation.deficiency(row) if status in ('deficient', 'borderline') else None
+            ))
+
+        return [
+            LocalAnalysis(readings[index], self.count_lab_lines(content))
+            for index, (content, _, _) in enumerate(reports)
+        ]
+
+    @staticmethod
+    def count_lab_lines(report_content: str) -> int:
+        return sum(1 for line in report_content.splitlines() if LAB_LINE_PATTERN.search(line))
+
+    @staticmethod
+    def parse_value(raw: str) -> Optional[Tuple[float, Optional[str]]]:
+        match = VALUE_PATTERN.match(raw or '')
+        if not match:
+            return None
+        return float(match.group(1).replace(',', '.')), match.group(2)
@@ -1,32 +1,26 @@
 from models.recovery_plan import RecoveryPlan
-from utils.firebase_client import FirebaseClient
+from utils.storage import StorageBackend
 from services.calendar_generator import CalendarGenerator
 from datetime import datetime, timedelta
 from typing import Dict, List
 
 class ScheduleAdjuster:
-    def __init__(self):
-        self.firebase_client = FirebaseClient()
-        self.calendar_generator = CalendarGenerator()
+    def __init__(self, storage: StorageBackend, calendar_generator: CalendarGenerator):
+        self.storage = storage
+        self.calendar_generator = calendar_generator
     
     def adjust_schedule(self, plan_id: str, missed_date: str, missed_activity_id: str):
         # Get the current plan
-        plan = self.firebase_client.get_recovery_plan(plan_id)
+        plan = self.storage.get_recovery_plan(plan_id)
         if not plan:
             return
         
         # Find the missed activity
         date_obj = datetime.strptime(missed_date, '%Y-%m-%d').date()
-        missed_activity = None
-        daily_activities = plan.daily_activities.get(date_obj, [])
-        
-        for activity in daily_activities:
-            if activity.id == missed_activity_id:
-                missed_activity = activity
-                break
-        
-        if not missed_activity:
+        found = plan.find_activity(missed_activity_id, date_obj)
+        if not found:
             return
+        missed_activity = found[1]
         
         # Determine adjustment strategy based on activity criticality
         if missed_activity.is_critical:
@@ -46,26 +40,23 @@ class ScheduleAdjuster:
                     # Add a modified version of the missed activity
                     adjusted_activity = missed_activity.copy()
                     adjusted_activity.duration = str(int(adjusted_activity.duration) // 3) if adjusted_activity.duration else ""
-                    plan.daily_activities[adjust_date].append(adjusted_activity)
+                    plan.add_activity(adjust_date, adjusted_activity)
         else:
             # Extend the plan by 1 day and add the missed activity
             plan.end_date += timedelta(days=1)
             new_date = plan.end_date
-            plan.daily_activities[new_date] = [missed_activity]
+            plan.add_activity(new_date, missed_activity.copy())
         
-        # Update the plan in Firebase
-        self.firebase_client.update_recovery_plan(plan)
+        # Update the plan in storage
+        self.storage.update_recovery_plan(plan)
     
     def _adjust_for_non_critical_miss(self, plan: RecoveryPlan, missed_date: datetime, missed_activity):
         # For non-critical misses, we can either add to next day or leave it
         next_date = missed_date + timedelta(days=1)
         
         if next_date <= plan.end_date:
-            if next_date in plan.daily_activities:
-                # Add the missed activity to the next day
-                plan.daily_activities[next_date].append(missed_activity)
-            else:
-                plan.daily_activities[next_date] = [missed_activity]
+            # Add the missed activity to the next day; the copy gets its own id
+            plan.add_activity(next_date, missed_activity.copy())
             
-            # Update the plan in Firebase
-            self.firebase_client.update_recovery_plan(plan)
\ No newline at end of file
+            # Update the plan in storage
+            self.storage.update_recovery_plan(plan)
\ No newline at end of file
@@ -0,0 +1,96 @@
+from datetime import date, timedelta
+from typing import Dict, List
+from models.recovery_plan import DailyActivity
+
+INTENSITY_LEVELS = ["low", "medium", "high"]
+
+class ProgressionRule:
+    """How a weekly template changes from one week to the next"""
+
+    def __init__(self, duration_increase_per_week: int = 0, max_duration: int = 0,
+                 intensity_ramp_weeks: int = 0):
+        self.duration_increase_per_week = duration_increase_per_week  # minutes added to exercises each week
+        self.max_duration = max_duration  # cap for exercise durations, 0 for no cap
+        self.intensity_ramp_weeks = intensity_ramp_weeks  # raise exercise intensity one level every N weeks, 0 to never
+
+    def to_dict(self):
+        return {
+            'duration_increase_per_week': self.duration_increase_per_week,
+            'max_duration': self.max_duration,
+            'intensity_ramp_weeks': self.intensity_ramp_weeks
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        def non_negative_int(value):
+            try:
+                return max(0, int(value))
+            except (TypeError, ValueError):
+                return 0
+
+        data = data or {}
+        return cls(
+            duration_increase_per_week=non_negative_int(data.get('duration_increase_per_week')),
+            max_duration=non_negative_int(data.get('max_duration')),
+            intensity_ramp_weeks=non_negative_int(data.get('intensity_ramp_weeks'))
+        )
+
+class WeeklyTemplateExpander:
+    """
+    Materializes a full daily_activities dict from a 7-day template and a
+    progression rule. Expansion is a pure function of its inputs, so the same
+    template always produces the same plan for a given start date and length.
+    """
+
+    def expand(self, week_template: List[List[dict]], progression: ProgressionRule,
+               start_date: date, days: int) -> Dict[date, List[DailyActivity]]:
+        if not week_template:
+            raise ValueError("Weekly template has no days")
+
+        daily_activities = {}
+        for day_index in range(days):
+            week = day_index // 7
+            template_day = week_template[day_index % len(week_template)]
+            daily_activities[start_date + timedelta(days=day_index)] = [
+                self._progress_activity(activity_data, week, progression)
+                for activity_data in template_day
+            ]
+        return daily_activities
+
+    def _progress_activity(self, activity_data: dict, week: int, progression: ProgressionRule) -> DailyActivity:
+        activity_type = activity_data.get('type', 'exercise')
+        duration = activity_data.get('duration', '')
+        intensity = activity_data.get('intensity', 'medium')
+
+        if activity_type == 'exercise' and week:
+            duration = self._progress_duration(duration, week, progression)
+            intensity = self._progress_intensity(intensity, week, progression)
+
+        return DailyActivity(
+            time=activity_data.get('time', 'morning'),
+            activity_type=activity_type,
+            description=activity_data.get('description', ''),
+            duration=duration,
+            intensity=intensity,
+            is_critical=activity_data.get('is_critical', False),
+            completed=False
+        )
+
+    def _progress_duration(self, duration, week: int, progression: ProgressionRule):
+        if not progression.duration_increase_per_week:
+            return duration
+        try:
+            minutes = int(str(duration).strip())
+        except ValueError:
+            return duration  # free-text durations are left as written
+
+        minutes += week * progression.duration_increase_per_week
+        if progression.max_duration:
+            minutes = min(minutes, progression.max_duration)
+        return str(minutes)
+
+    def _progress_intensity(self, intensity: str, week: int, progression: ProgressionRule) -> str:
+        if not progression.intensity_ramp_weeks or intensity not in INTENSITY_LEVELS:
+            return intensity
+        level = INTENSITY_LEVELS.index(intensity) + week // progression.intensity_ramp_weeks
+        return INTENSITY_LEVELS[min(level, len(INTENSITY_LEVELS) - 1)]
@@ -26,5 +26,40 @@ function showNotification(title, message) {
     }
 }
 
-// Example usage - you would call this from your notification system
-// showNotification("Recovery Activity", "Time for your morning exercise!");
\ No newline at end of file
+// Reminders pushed by the server, on the pages that ask for them (data-notification-stream).
+// EventSource reconnects and resumes on its own after a dropped connection, but gives up for good
+// on an error status such as the 503 sent when the server is at its stream limit, so reopen it here
+const STREAM_BUSY_RETRY_MS = 30000;
+const STREAM_MAX_RETRY_MS = 5 * 60 * 1000;
+
+function openReminderStream(streamUrl, lastEventId, retryDelay) {
+    const url = new URL(streamUrl, window.location.href);
+    if (lastEventId) {
+        url.searchParams.set('last_event_id', lastEventId);
+    }
+
+    const source = new EventSource(url);
+    source.addEventListener('open', function() {
+        retryDelay = STREAM_BUSY_RETRY_MS;
+    });
+    source.addEventListener('reminder', function(event) {
+        lastEventId = event.lastEventId;
+        const data = JSON.parse(event.data);
+        showNotification(data.title, data.message);
+    });
+    source.addEventListener('error', function() {
+        if (source.readyState === EventSource.CLOSED) {
+            setTimeout(function() {
+                openReminderStream(streamUrl, lastEventId, Math.min(retryDelay * 2, STREAM_MAX_RETRY_MS));
+            }, retryDelay);
+        }
+    });
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+    const streamUrl = document.body.dataset.notificationStream;
+    if (!streamUrl || !window.EventSource) {
+        return;
+    }
+    openReminderStream(streamUrl, null, STREAM_BUSY_RETRY_MS);
+});
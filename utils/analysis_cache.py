@@ -0,0 +1,103 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+from models.deficiency import Deficiency
+import logging
+
+class AnalysisCache:
+    """On-disk LRU cache of report analyses keyed by file content hash and analysis version."""
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> size in bytes, oldest first
+        self._total_bytes = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_index()
+
+    @staticmethod
+    def hash_file(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+        """Compute the SHA-256 of a file without loading it into memory"""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as file:
+            for chunk in iter(lambda: file.read(chunk_size), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def make_key(file_hash: str, version: str) -> str:
+        version_tag = hashlib.sha256(version.encode('utf-8')).hexdigest()[:16]
+        return f"{file_hash}_{version_tag}"
+
+    def get(self, key: str) -> Optional[List[Deficiency]]:
+        with self._lock:
+            if key not in self._entries:
+                return None
+            path = self._path(key)
+            try:
+                with open(path, 'r', encoding='utf-8') as file:
+                    data = json.load(file)
+                os.utime(path)
+            except (OSError, ValueError) as e:
+                self.logger.warning(f"Dropping unreadable cache entry {key}: {str(e)}")
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+        return [Deficiency.from_dict(d) for d in data.get('deficiencies', [])]
+
+    def put(self, key: str, deficiencies: List[Deficiency]):
+        payload = json.dumps({'deficiencies': [d.to_dict() for d in deficiencies]})
+        size = len(payload.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            path = self._path(key)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as file:
+                    file.write(payload)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                self.logger.warning(f"Failed to write cache entry {key}: {str(e)}")
+                return
+
+            if key in self._entries:
+                self._total_bytes -= self._entries.pop(key)
+            self._entries[key] = size
+            self._total_bytes += size
+            self._evict()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _load_index(self):
+        """Rebuild the LRU order from the mtimes touched on every cache hit"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            stat = os.stat(os.path.join(self.cache_dir, name))
+            entries.append((stat.st_mtime, name[:-len('.json')], stat.st_size))
+
+        for _, key, size in sorted(entries):
+            self._entries[key] = size
+            self._total_bytes += size
+        self._evict()
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and self._entries:
+            key = next(iter(self._entries))
+            self._remove(key)
+
+    def _remove(self, key: str):
+        self._total_bytes -= self._entries.pop(key, 0)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
@@ -0,0 +1,75 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional
+from models.extracted_content import ExtractedContent
+import logging
+
+class ExtractionCache:
+    """
+    Two-tier cache of ExtractedContent: a byte-bounded in-process LRU for hot
+    reports in front of the copy persisted by the storage backend. Storage
+    failures are logged and never fail an analysis; the file is simply
+    extracted again.
+    """
+
+    def __init__(self, storage, max_bytes: int):
+        self.storage = storage  # None keeps only the local tier
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.storage_hits = 0
+        self.misses = 0
+        self.logger = logging.getLogger(__name__)
+        self._lock = Lock()
+        self._entries = OrderedDict()  # key -> (size, extraction), least recently used first
+        self._total_bytes = 0
+
+    def get(self, key: str) -> Optional[ExtractedContent]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+        extraction = None
+        if self.storage is not None:
+            try:
+                extraction = self.storage.get_extraction(key)
+            except Exception as e:
+                self.logger.warning(f"Could not load extraction {key}: {str(e)}")
+
+        with self._lock:
+            if extraction is None:
+                self.misses += 1
+                return None
+            self.storage_hits += 1
+            self._put_local(key, extraction)
+        return extraction
+
+    def put(self, extraction: ExtractedContent):
+        with self._lock:
+            self._put_local(extraction.key, extraction)
+        if self.storage is not None:
+            try:
+                self.storage.save_extraction(extraction)
+            except Exception as e:
+                self.logger.warning(f"Could not persist extraction {extraction.key}: {str(e)}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'hits': self.hits, 'storage_hits': self.storage_hits, 'misses': self.misses,
+                    'size': len(self._entries), 'bytes': self._total_bytes}
+
+    def _put_local(self, key: str, extraction: ExtractedContent):
+        # Must be called with self._lock held
+        size = len(extraction.text)  # characters; close enough to bytes for lab text
+        if size > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._total_bytes -= previous[0]
+        self._entries[key] = (size, extraction)
+        self._total_bytes += size
+        while self._total_bytes > self.max_bytes:
+            _, (evicted_size, _) = self._entries.popitem(last=False)
+            self._total_bytes -= evicted_size
@@ -1,14 +1,26 @@
 import firebase_admin
 from firebase_admin import credentials, firestore, auth
-from datetime import datetime
+from datetime import date, datetime
 from config import Config
-from models.user import User
 from models.medical_report import MedicalReport
-from models.recovery_plan import RecoveryPlan
-from typing import List
+from models.extracted_content import ExtractedContent
+from models.recovery_plan import DailyActivity, RecoveryPlan, completion_path, read_path
+from models.summary import PlanSummary, ReportSummary, parse_cursor
+from utils.storage import StorageBackend
+from typing import List, Optional, Tuple
 
-class FirebaseClient:
+# Plans at this layout keep metadata in the plan document and activities in a
+# 'days' subcollection; older plans store every day inline in 'daily_activities'
+PLAN_LAYOUT_VERSION = 2
+BATCH_WRITE_LIMIT = 500
+# Firestore documents are capped at 1 MiB; leave room for the NLP output and field names
+EXTRACTION_TEXT_LIMIT = 900 * 1024
+
+class FirebaseClient(StorageBackend):
+    """Firestore storage backend"""
+    
     def __init__(self):
+        super().__init__()
         if not firebase_admin._apps:
             try:
                 # Initialize with the service account key
@@ -23,20 +35,32 @@ class FirebaseClient:
         self.db = firestore.client()
     
     # User operations
-    def get_user(self, user_id: str) -> User:
+    def _load_user(self, user_id: str) -> dict:
         doc = self.db.collection('users').document(user_id).get()
         if doc.exists:
-            return User.from_dict(doc.to_dict())
+            return doc.to_dict()
+        return None
+    
+    def _load_user_by_email(self, email: str) -> dict:
+        docs = self.db.collection('users').where('email', '==', email).limit(1).get()
+        if docs:
+            return docs[0].to_dict()
         return None
     
-    def create_user(self, user_data: dict) -> User:
+    def _write_user(self, user_data: dict):
         user_ref = self.db.collection('users').document(user_data['id'])
         user_ref.set(user_data)
-        return User.from_dict(user_data)
+    
+    def _update_user(self, user_id: str, changes: dict):
+        self.db.collection('users').document(user_id).update(changes)
     
     # Report operations
     def save_report(self, report: MedicalReport):
-        self.db.collection('medical_reports').document(report.report_id).set(report.to_dict())
+        batch = self.db.batch()
+        batch.set(self.db.collection('medical_reports').document(report.report_id), report.to_dict())
+        batch.set(self.db.collection('report_summaries').document(report.report_id),
+                  ReportSummary.from_report(report).to_dict())
+        batch.commit()
     
     def get_report(self, report_id: str) -> MedicalReport:
         doc = self.db.collection('medical_reports').document(report_id).get()
@@ -48,55 +72,183 @@ class FirebaseClient:
         docs = self.db.collection('medical_reports').where('user_id', '==', user_id).get()
         return [MedicalReport.from_dict(doc.to_dict()) for doc in docs]
     
+    def delete_report(self, report_id: str):
+        batch = self.db.batch()
+        batch.delete(self.db.collection('medical_reports').document(report_id))
+        batch.delete(self.db.collection('report_summaries').document(report_id))
+        batch.commit()
+    
+    def find_analyzed_report(self, file_hash: str, analysis_version: str) -> Optional[MedicalReport]:
+        docs = (self.db.collection('medical_reports').where('file_hash', '==', file_hash)
+                .where('analysis_version', '==', analysis_version).limit(1).get())
+        if docs:
+            return MedicalReport.from_dict(docs[0].to_dict())
+        return None
+    
+    def list_user_reports(self, user_id: str, limit: int = 20,
+                          cursor: str = None) -> Tuple[List[ReportSummary], Optional[str]]:
+        # Needs a composite index on report_summaries (user_id, upload_date desc, report_id desc)
+        query = (self.db.collection('report_summaries').where('user_id', '==', user_id)
+                 .order_by('upload_date', direction=firestore.Query.DESCENDING)
+                 .order_by('report_id', direction=firestore.Query.DESCENDING))
+        position = parse_cursor(cursor)
+        if position:
+            query = query.start_after({'upload_date': position[0], 'report_id': position[1]})
+        docs = query.limit(limit + 1).get()
+        return self._paginate([ReportSummary.from_dict(doc.to_dict()) for doc in docs], limit)
+    
+    # Extracted report content
+    def get_extraction(self, key: str) -> Optional[ExtractedContent]:
+        doc = self.db.collection('report_extractions').document(key).get()
+        if doc.exists:
+            return ExtractedContent.from_dict(doc.to_dict())
+        return None
+    
+    def save_extraction(self, extraction: ExtractedContent):
+        if len(extraction.text.encode('utf-8')) > EXTRACTION_TEXT_LIMIT:
+            # Too large for one document; the local tier still holds it
+            return
+        self.db.collection('report_extractions').document(extraction.key).set(extraction.to_dict())
+    
     # Recovery plan operations
-    def save_recovery_plan(self, plan: RecoveryPlan):
-        self.db.collection('recovery_plans').document(plan.plan_id).set(plan.to_dict())
+    def _write_plan(self, plan: RecoveryPlan, days: List[date], removed_days: List[date]):
+        plan_ref = self.db.collection('recovery_plans').document(plan.plan_id)
+        writes = [
+            (plan_ref, dict(plan.metadata_to_dict(), layout_version=PLAN_LAYOUT_VERSION)),
+            (self.db.collection('plan_summaries').document(plan.plan_id), PlanSummary.from_plan(plan).to_dict())
+        ]
+        writes.extend(
+            (plan_ref.collection('days').document(day.isoformat()), plan.day_to_dict(day))
+            for day in days
+        )
+        writes.extend((plan_ref.collection('days').document(day.isoformat()), None) for day in removed_days)
+        
+        for i in range(0, len(writes), BATCH_WRITE_LIMIT):
+            batch = self.db.batch()
+            for ref, data in writes[i:i + BATCH_WRITE_LIMIT]:
+                if data is None:
+                    batch.delete(ref)
+                else:
+                    batch.set(ref, data)
+            batch.commit()
     
     def get_recovery_plan(self, plan_id: str) -> RecoveryPlan:
         doc = self.db.collection('recovery_plans').document(plan_id).get()
         if doc.exists:
-            return RecoveryPlan.from_dict(doc.to_dict())
+            return self._load_recovery_plan(doc)
         return None
     
+    def get_plan_owner(self, plan_id: str) -> str:
+        """Read just the plan's user id, without loading any activities for the new layout"""
+        doc = self.db.collection('recovery_plans').document(plan_id).get(field_paths=['user_id'])
+        if doc.exists:
+            return doc.get('user_id')
+        return None
+    
+    def get_plan_day(self, plan_id: str, day: date) -> List[DailyActivity]:
+        plan_ref = self.db.collection('recovery_plans').document(plan_id)
+        doc = plan_ref.collection('days').document(day.isoformat()).get()
+        if doc.exists:
+            templates = None
+            if 'template' in doc.to_dict():
+                metadata = plan_ref.get(field_paths=['day_templates'])
+                templates = metadata.to_dict().get('day_templates') if metadata.exists else None
+            return RecoveryPlan.day_from_dict(doc.to_dict(), templates)[1]
+        # Legacy plans, and days outside the plan, go through the whole document
+        return super().get_plan_day(plan_id, day)
+    
     def get_user_plans(self, user_id: str) -> List[RecoveryPlan]:
         docs = self.db.collection('recovery_plans').where('user_id', '==', user_id).get()
-        return [RecoveryPlan.from_dict(doc.to_dict()) for doc in docs]
+        return [self._load_recovery_plan(doc) for doc in docs]
     
-    def get_user_by_email(self, email: str) -> User:
-        docs = self.db.collection('users').where('email', '==', email).limit(1).get()
-        if docs:
-            return User.from_dict(docs[0].to_dict())
-        return None
+    def list_user_plans(self, user_id: str, limit: int = 20,
+                        cursor: str = None) -> Tuple[List[PlanSummary], Optional[str]]:
+        # Needs a composite index on plan_summaries (user_id, start_date desc, plan_id desc)
+        query = (self.db.collection('plan_summaries').where('user_id', '==', user_id)
+                 .order_by('start_date', direction=firestore.Query.DESCENDING)
+                 .order_by('plan_id', direction=firestore.Query.DESCENDING))
+        position = parse_cursor(cursor)
+        if position:
+            query = query.start_after({'start_date': position[0], 'plan_id': position[1]})
+        docs = query.limit(limit + 1).get()
+        return self._paginate([PlanSummary.from_dict(doc.to_dict()) for doc in docs], limit)
+    
+    def _load_recovery_plan(self, doc) -> RecoveryPlan:
+        data = doc.to_dict()
+        if data.get('layout_version', 1) < PLAN_LAYOUT_VERSION:
+            return RecoveryPlan.from_dict(data)
+        day_docs = doc.reference.collection('days').stream()
+        return RecoveryPlan.from_documents(data, [d.to_dict() for d in day_docs])
     
-    def update_activity_status(self, plan_id: str, date_str: str, activity_id: str, completed: bool):
+    def migrate_recovery_plan(self, plan_id: str) -> bool:
+        """Move a plan stored with inline daily_activities to per-day documents"""
+        doc = self.db.collection('recovery_plans').document(plan_id).get()
+        if not doc.exists or doc.to_dict().get('layout_version', 1) >= PLAN_LAYOUT_VERSION:
+            return False
+        # Writing the metadata document replaces it, which drops the inline daily_activities
+        self.save_recovery_plan(RecoveryPlan.from_dict(doc.to_dict()))
+        return True
+    
+    def migrate_recovery_plans(self) -> int:
+        """One-off migration of every legacy plan; returns the number migrated"""
+        migrated = 0
+        for doc in self.db.collection('recovery_plans').stream():
+            if doc.to_dict().get('layout_version', 1) < PLAN_LAYOUT_VERSION:
+                self.save_recovery_plan(RecoveryPlan.from_dict(doc.to_dict()))
+                migrated += 1
+        return migrated
+    
+    def backfill_summaries(self) -> int:
+        """One-off write of summary documents for plans and reports saved before summaries existed"""
+        written = 0
+        summaries = self.db.collection('plan_summaries')
+        for doc in self.db.collection('recovery_plans').stream():
+            if not summaries.document(doc.id).get().exists:
+                summaries.document(doc.id).set(PlanSummary.from_plan(self._load_recovery_plan(doc)).to_dict())
+                written += 1
+        summaries = self.db.collection('report_summaries')
+        for doc in self.db.collection('medical_reports').stream():
+            if not summaries.document(doc.id).get().exists:
+                report = MedicalReport.from_dict(doc.to_dict())
+                summaries.document(doc.id).set(ReportSummary.from_report(report).to_dict())
+                written += 1
+        return written
+    
+    def update_activity_status(self, plan_id: str, date_str: str, activity_id: str, completed: bool) -> bool:
         date = datetime.strptime(date_str, '%Y-%m-%d').date()
-        plan_ref = self.db.collection('recovery_plans').document(plan_id)
+        day_ref = (self.db.collection('recovery_plans').document(plan_id)
+                   .collection('days').document(date.isoformat()))
+        summary_ref = self.db.collection('plan_summaries').document(plan_id)
         
-        # Get the current plan
-        plan = self.get_recovery_plan(plan_id)
-        if not plan:
-            return
-        
-        # Find and update the activity
-        updated = False
-        for activity in plan.daily_activities.get(date, []):
-            if activity.id == activity_id:
-                activity.completed = completed
-                updated = True
-                break
+        @firestore.transactional
+        def set_completed(transaction):
+            snapshot = day_ref.get(transaction=transaction)
+            if not snapshot.exists:
+                return None
+            path = completion_path(snapshot.to_dict(), activity_id)
+            if path is None:
+                return False
+            was_completed = bool(read_path(snapshot.to_dict(), path))
+            summary = summary_ref.get(transaction=transaction)
+            # Only the one flag is written, not the day or the plan
+            transaction.update(day_ref, {firestore.FieldPath(*path).to_api_repr(): completed})
+            if summary.exists and was_completed != completed:
+                transaction.update(summary_ref, {
+                    'completed_activities': firestore.Increment(1 if completed else -1)
+                })
+            return True
         
-        if updated:
-            # Save the updated plan
-            plan_ref.set(plan.to_dict())
-    
-    def update_recovery_plan(self, plan: RecoveryPlan):
-        self.db.collection('recovery_plans').document(plan.plan_id).set(plan.to_dict())
-    
-    def log_notification(self, plan_id: str, date: str, activity_id: str, timestamp: datetime):
-        log_data = {
-            'plan_id': plan_id,
-            'date': date,
-            'activity_id': activity_id,
-            'timestamp': timestamp
-        }
-        self.db.collection('notification_logs').add(log_data)
\ No newline at end of file
+        updated = set_completed(self.db.transaction())
+        if updated is None and self.migrate_recovery_plan(plan_id):
+            # Legacy plans are moved to per-day documents on their first update
+            updated = set_completed(self.db.transaction())
+        return bool(updated)
+    
+    def log_notifications(self, entries: List[dict]):
+        """Write many notification logs with batched commits instead of one add() per entry"""
+        logs = self.db.collection('notification_logs')
+        for i in range(0, len(entries), BATCH_WRITE_LIMIT):
+            batch = self.db.batch()
+            for log_data in entries[i:i + BATCH_WRITE_LIMIT]:
+                batch.set(logs.document(), log_data)
+            batch.commit()
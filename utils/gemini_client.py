@@ -1,31 +1,178 @@
+import json
+import logging
+import random
+import threading
+import time
+from collections import deque
 import google.generativeai as genai
+from google.api_core import exceptions as api_exceptions
 from config import Config
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Quota, overload and transient server errors; anything else (bad request, auth, safety blocks) fails at once
+RETRYABLE_ERRORS = (
+    api_exceptions.TooManyRequests,
+    api_exceptions.ResourceExhausted,
+    api_exceptions.InternalServerError,
+    api_exceptions.BadGateway,
+    api_exceptions.ServiceUnavailable,
+    api_exceptions.GatewayTimeout,
+    api_exceptions.DeadlineExceeded,
+    api_exceptions.Aborted,
+    ConnectionError,
+    TimeoutError,
+)
+
+class GeminiError(Exception):
+    """A Gemini call failed, ran out of time, or returned no text"""
+
+class TokenBucket:
+    """Allows rate requests per second on average, with bursts of up to capacity"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate  # 0 disables limiting
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline: float) -> bool:
+        """Take a token, waiting for one until the monotonic deadline; False if it passes first"""
+        if self.rate <= 0:
+            return True
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+class GeminiMetrics:
+    """Call counts, retries and latency percentiles over the most recent calls"""
+
+    def __init__(self, window: int = 500):
+        self.calls = 0
+        self.failures = 0
+        self.retries = 0
+        self.throttled_seconds = 0.0  # time spent waiting on the rate limiter and the concurrency cap
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record_call(self, latency: float, succeeded: bool):
+        with self._lock:
+            self.calls += 1
+            if not succeeded:
+                self.failures += 1
+            self._latencies.append(latency)
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self.throttled_seconds += seconds
+
+    def stats(self) -> dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            stats = {'calls': self.calls, 'failures': self.failures, 'retries': self.retries,
+                     'throttled_seconds': round(self.throttled_seconds, 3)}
+        for name, share in (('p50', 0.5), ('p95', 0.95), ('max', 1.0)):
+            stats[f'latency_{name}'] = latencies[min(len(latencies) - 1, int(share * len(latencies)))] if latencies else None
+        return stats
+
 class GeminiClient:
+    """
+    Gemini client shared by every service. Each call gets an overall
+    deadline; retryable errors are retried with jittered exponential backoff
+    inside it. A token bucket keeps the process within the request quota and
+    a semaphore caps how many requests are in flight at once.
+    """
+
     def __init__(self):
         genai.configure(api_key=Config.GEMINI_API_KEY)
-        self.model = genai.GenerativeModel("gemini-2.0-flash")
-    
-    def generate_text(self, prompt: str) -> str:
+        self.model_name = Config.GEMINI_MODEL
+        self.model = genai.GenerativeModel(self.model_name)
+        self.deadline_seconds = Config.GEMINI_DEADLINE_SECONDS
+        self.attempt_timeout = Config.GEMINI_ATTEMPT_TIMEOUT_SECONDS
+        self.max_retries = Config.GEMINI_MAX_RETRIES
+        self.backoff_base = Config.GEMINI_BACKOFF_BASE_SECONDS
+        self.backoff_max = Config.GEMINI_BACKOFF_MAX_SECONDS
+        self.rate_limiter = TokenBucket(Config.GEMINI_REQUESTS_PER_MINUTE / 60.0, Config.GEMINI_BURST)
+        self.metrics = GeminiMetrics()
+        self.logger = logging.getLogger(__name__)
+        self._in_flight = threading.BoundedSemaphore(max(1, Config.GEMINI_MAX_CONCURRENT))
+
+    def generate_text(self, prompt: str, deadline_seconds: float = None) -> str:
+        """Response text for a prompt; raises GeminiError instead of returning an empty answer"""
+        started = time.monotonic()
+        deadline = started + (deadline_seconds or self.deadline_seconds)
+        succeeded = False
         try:
-            response = self.model.generate_content(prompt)
-            return response.text
+            for attempt in range(self.max_retries + 1):
+                try:
+                    text = self._attempt(prompt, deadline)
+                    succeeded = True
+                    return text
+                except RETRYABLE_ERRORS as e:
+                    if attempt == self.max_retries:
+                        raise GeminiError(f"Gemini call failed after {attempt + 1} attempts: {e}") from e
+                    # Full jitter keeps workers that failed together from retrying together
+                    delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+                    if time.monotonic() + delay >= deadline:
+                        raise GeminiError(f"Gemini call deadline exceeded after {attempt + 1} attempts: {e}") from e
+                    self.logger.warning(f"Gemini attempt {attempt + 1} failed ({type(e).__name__}), "
+                                        f"retrying in {delay:.1f}s: {e}")
+                    self.metrics.record_retry()
+                    time.sleep(delay)
+        except GeminiError as e:
+            self.logger.error(str(e))
+            raise
         except Exception as e:
-            print(f"Error generating text with Gemini: {e}")
-            return ""
-    
+            self.logger.error(f"Error generating text with Gemini: {e}")
+            raise GeminiError(str(e)) from e
+        finally:
+            self.metrics.record_call(time.monotonic() - started, succeeded)
+
     def generate_structured_data(self, prompt: str) -> dict:
+        # Add instruction to return JSON
+        json_prompt = f"{prompt}\n\nReturn the response as valid JSON only."
+        response = self.generate_text(json_prompt)
         try:
-            # Add instruction to return JSON
-            json_prompt = f"{prompt}\n\nReturn the response as valid JSON only."
-            response = self.model.generate_content(json_prompt)
-            
-            # Try to parse the response as JSON
-            import json
-            return json.loads(response.text)
-        except Exception as e:
-            print(f"Error generating structured data with Gemini: {e}")
-            return {}
\ No newline at end of file
+            return json.loads(response)
+        except ValueError as e:
+            self.logger.warning(f"Gemini returned invalid JSON: {e}")
+            return {}
+
+    def _attempt(self, prompt: str, deadline: float) -> str:
+        waiting_since = time.monotonic()
+        if not self.rate_limiter.acquire(deadline):
+            raise GeminiError("Gemini call deadline exceeded waiting for the rate limit")
+        if not self._in_flight.acquire(timeout=max(0.0, deadline - time.monotonic())):
+            raise GeminiError("Gemini call deadline exceeded waiting for a free request slot")
+        self.metrics.record_wait(time.monotonic() - waiting_since)
+        try:
+            timeout = min(self.attempt_timeout, deadline - time.monotonic())
+            if timeout <= 0:
+                raise GeminiError("Gemini call deadline exceeded")
+            response = self.model.generate_content(prompt, request_options={'timeout': timeout})
+        finally:
+            self._in_flight.release()
+
+        try:
+            text = response.text
+        except ValueError as e:
+            # No candidates, e.g. the prompt or answer was blocked
+            raise GeminiError(f"Gemini returned no text: {e}") from e
+        if not text:
+            raise GeminiError("Gemini returned an empty response")
+        return text
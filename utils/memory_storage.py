@@ -0,0 +1,170 @@
+import copy
+from datetime import date, datetime
+from threading import RLock
+from typing import List, Optional, Tuple
+from models.medical_report import MedicalReport
+from models.extracted_content import ExtractedContent
+from models.recovery_plan import DailyActivity, RecoveryPlan, completion_path, read_path, set_path
+from models.summary import PlanSummary, ReportSummary, parse_cursor
+from utils.storage import StorageBackend
+
+class InMemoryStorage(StorageBackend):
+    """
+    Process-local storage for tests, benchmarks and running without credentials.
+    Data is kept in the same serialized shapes the other backends store, so
+    every read decodes fresh objects just like a real round-trip would.
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self._lock = RLock()
+        self._users = {}
+        self._user_ids_by_email = {}
+        self._reports = {}
+        self._report_ids_by_user = {}
+        self._report_summaries = {}
+        self._extractions = {}
+        self._plans = {}  # plan id -> metadata
+        self._plan_days = {}  # plan id -> {iso date: day document}
+        self._plan_ids_by_user = {}
+        self._plan_summaries = {}
+        self.notification_logs = []
+    
+    # User operations
+    def _load_user(self, user_id: str) -> dict:
+        with self._lock:
+            return copy.deepcopy(self._users.get(user_id))
+    
+    def _load_user_by_email(self, email: str) -> dict:
+        with self._lock:
+            return self._load_user(self._user_ids_by_email.get(email))
+    
+    def _write_user(self, user_data: dict):
+        with self._lock:
+            previous = self._users.get(user_data['id'])
+            if previous:
+                self._user_ids_by_email.pop(previous.get('email'), None)
+            self._users[user_data['id']] = copy.deepcopy(user_data)
+            self._user_ids_by_email[user_data.get('email')] = user_data['id']
+    
+    def _update_user(self, user_id: str, changes: dict):
+        with self._lock:
+            user_data = dict(self._users[user_id], **changes)
+            self._write_user(user_data)
+    
+    # Report operations
+    def save_report(self, report: MedicalReport):
+        with self._lock:
+            self._reports[report.report_id] = report.to_dict()
+            self._report_summaries[report.report_id] = ReportSummary.from_report(report).to_dict()
+            self._report_ids_by_user.setdefault(report.user_id, {})[report.report_id] = True
+    
+    def get_report(self, report_id: str) -> MedicalReport:
+        with self._lock:
+            data = self._reports.get(report_id)
+            return MedicalReport.from_dict(copy.deepcopy(data)) if data else None
+    
+    def get_user_reports(self, user_id: str) -> List[MedicalReport]:
+        with self._lock:
+            return [self.get_report(report_id) for report_id in self._report_ids_by_user.get(user_id, {})]
+    
+    def delete_report(self, report_id: str):
+        with self._lock:
+            data = self._reports.pop(report_id, None)
+            self._report_summaries.pop(report_id, None)
+            if data:
+                self._report_ids_by_user.get(data['user_id'], {}).pop(report_id, None)
+    
+    def find_analyzed_report(self, file_hash: str, analysis_version: str) -> Optional[MedicalReport]:
+        with self._lock:
+            for data in self._reports.values():
+                if data.get('file_hash') == file_hash and data.get('analysis_version') == analysis_version:
+                    return MedicalReport.from_dict(copy.deepcopy(data))
+            return None
+    
+    def list_user_reports(self, user_id: str, limit: int = 20,
+                          cursor: str = None) -> Tuple[List[ReportSummary], Optional[str]]:
+        with self._lock:
+            summaries = [self._report_summaries[report_id] for report_id in self._report_ids_by_user.get(user_id, {})]
+            page = self._page(summaries, 'upload_date', 'report_id', limit, cursor)
+            return self._paginate([ReportSummary.from_dict(copy.deepcopy(s)) for s in page], limit)
+    
+    # Extracted report content
+    def get_extraction(self, key: str) -> Optional[ExtractedContent]:
+        with self._lock:
+            data = self._extractions.get(key)
+            return ExtractedContent.from_dict(copy.deepcopy(data)) if data else None
+    
+    def save_extraction(self, extraction: ExtractedContent):
+        with self._lock:
+            self._extractions[extraction.key] = extraction.to_dict()
+    
+    # Recovery plan operations
+    def _write_plan(self, plan: RecoveryPlan, days: List[date], removed_days: List[date]):
+        with self._lock:
+            self._plans[plan.plan_id] = copy.deepcopy(plan.metadata_to_dict())
+            stored_days = self._plan_days.setdefault(plan.plan_id, {})
+            for day in days:
+                stored_days[day.isoformat()] = copy.deepcopy(plan.day_to_dict(day))
+            for day in removed_days:
+                stored_days.pop(day.isoformat(), None)
+            self._plan_ids_by_user.setdefault(plan.user_id, {})[plan.plan_id] = True
+            self._plan_summaries[plan.plan_id] = PlanSummary.from_plan(plan).to_dict()
+    
+    def get_recovery_plan(self, plan_id: str) -> RecoveryPlan:
+        with self._lock:
+            metadata = self._plans.get(plan_id)
+            if not metadata:
+                return None
+            day_documents = copy.deepcopy(list(self._plan_days.get(plan_id, {}).values()))
+            return RecoveryPlan.from_documents(copy.deepcopy(metadata), day_documents)
+    
+    def get_plan_owner(self, plan_id: str) -> str:
+        with self._lock:
+            metadata = self._plans.get(plan_id)
+            return metadata['user_id'] if metadata else None
+    
+    def get_plan_day(self, plan_id: str, day: date) -> List[DailyActivity]:
+        with self._lock:
+            data = self._plan_days.get(plan_id, {}).get(day.isoformat())
+            if not data:
+                return []
+            templates = self._plans[plan_id].get('day_templates')
+            return RecoveryPlan.day_from_dict(copy.deepcopy(data), copy.deepcopy(templates))[1]
+    
+    def get_user_plans(self, user_id: str) -> List[RecoveryPlan]:
+        with self._lock:
+            return [self.get_recovery_plan(plan_id) for plan_id in self._plan_ids_by_user.get(user_id, {})]
+    
+    def list_user_plans(self, user_id: str, limit: int = 20,
+                        cursor: str = None) -> Tuple[List[PlanSummary], Optional[str]]:
+        with self._lock:
+            summaries = [self._plan_summaries[plan_id] for plan_id in self._plan_ids_by_user.get(user_id, {})]
+            page = self._page(summaries, 'start_date', 'plan_id', limit, cursor)
+            return self._paginate([PlanSummary.from_dict(copy.deepcopy(s)) for s in page], limit)
+    
+    @staticmethod
+    def _page(summaries: List[dict], sort_key: str, id_key: str, limit: int, cursor: str) -> List[dict]:
+        def key(summary):
+            return summary[sort_key], summary[id_key]
+        position = parse_cursor(cursor)
+        if position:
+            summaries = [s for s in summaries if key(s) < position]
+        return sorted(summaries, key=key, reverse=True)[:limit + 1]
+    
+    def update_activity_status(self, plan_id: str, date_str: str, activity_id: str, completed: bool) -> bool:
+        day_key = datetime.strptime(date_str, '%Y-%m-%d').date().isoformat()
+        with self._lock:
+            day = self._plan_days.get(plan_id, {}).get(day_key)
+            path = completion_path(day, activity_id) if day else None
+            if path is None:
+                return False
+            if bool(read_path(day, path)) != completed:
+                self._plan_summaries[plan_id]['completed_activities'] += 1 if completed else -1
+            set_path(day, path, completed)
+            return True
+    
+    # Notification logs
+    def log_notifications(self, entries: List[dict]):
+        with self._lock:
+            self.notification_logs.extend(dict(entry) for entry in entries)
@@ -1,53 +1,132 @@
 import spacy
 from spacy.matcher import PhraseMatcher
-from typing import List, Dict
+from typing import Iterator, List, Dict, Tuple
+from config import Config
 import re
 
+VALUE_WITH_UNIT = re.compile(r'\d+(?:[.,]\d+)?\s*(?:[a-zA-Zµμ%]+(?:/[a-zA-Z]+)?)?')
+
+# Words that make a line a different analyte from the plain serum test, e.g. "Calcium, ionized" or
+# "24h urine calcium"; such results are named with the qualifier so the local ranges don't apply
+QUALIFIER_PATTERN = re.compile(r'\b(ioni[sz]ed|free|urine|urinary|24\s*-?\s*h(?:ou)?rs?|24\s*h)\b', re.IGNORECASE)
+
+# Components of en_core_web_sm that matching and token lookahead never use
+UNUSED_COMPONENTS = ["tok2vec", "tagger", "parser", "senter", "attribute_ruler", "lemmatizer", "ner"]
+
 class NLPProcessor:
-    def __init__(self):
-        self.nlp = spacy.load("en_core_web_sm")
+    """
+    Finds test results and deficiency mentions with PhraseMatchers. Only the
+    tokenizer is needed for that, so by default no trained components are
+    loaded: 'blank' is the bare English tokenizer, 'slim' is en_core_web_sm
+    without its components, and 'full' loads the whole model.
+    """
+
+    def __init__(self, pipeline: str = None):
+        self.pipeline = pipeline or Config.NLP_PIPELINE
+        if self.pipeline == 'blank':
+            self.nlp = spacy.blank("en")
+        elif self.pipeline == 'slim':
+            self.nlp = spacy.load("en_core_web_sm", exclude=UNUSED_COMPONENTS)
+        elif self.pipeline == 'full':
+            self.nlp = spacy.load("en_core_web_sm")
+        else:
+            raise ValueError(f"Unknown NLP pipeline: {self.pipeline}")
         self._initialize_matchers()
-    
+
     def _initialize_matchers(self):
         # Initialize matchers for different types of medical information
-        self.deficiency_matcher = PhraseMatcher(self.nlp.vocab)
+        # Patterns only need tokenizing, and LOWER matches "Vitamin D" as well as "vitamin d"
+        self.deficiency_matcher = PhraseMatcher(self.nlp.vocab, attr="LOWER")
         deficiency_terms = [
-            "deficiency", "low", "below normal", "insufficient", 
+            "deficiency", "low", "below normal", "insufficient",
             "borderline", "deficient", "inadequate"
         ]
-        patterns = [self.nlp(text) for text in deficiency_terms]
+        patterns = [self.nlp.make_doc(text) for text in deficiency_terms]
         self.deficiency_matcher.add("DEFICIENCY", patterns)
-        
-        self.test_matcher = PhraseMatcher(self.nlp.vocab)
+
+        self.test_matcher = PhraseMatcher(self.nlp.vocab, attr="LOWER")
         test_terms = [
-            "vitamin d", "vitamin b12", "iron", "hemoglobin", 
+            "vitamin d", "vitamin b12", "iron", "hemoglobin",
             "calcium", "magnesium", "potassium", "sodium"
         ]
-        patterns = [self.nlp(text) for text in test_terms]
+        patterns = [self.nlp.make_doc(text) for text in test_terms]
         self.test_matcher.add("TEST", patterns)
-    
+
     def extract_medical_info(self, text: str) -> Dict[str, List[str]]:
-        doc = self.nlp(text)
-        
-        # Find deficiency mentions
+        """
+        Deficiency mentions and test results. A test found more than once with
+        different values maps to None, which the local rules treat as unreadable.
+        """
         deficiencies = []
-        matches = self.deficiency_matcher(doc)
-        for match_id, start, end in matches:
-            span = doc[start:end]
-            deficiencies.append(span.text)
-        
-        # Find test names and values
         tests = {}
-        matches = self.test_matcher(doc)
-        for match_id, start, end in matches:
-            test_name = doc[start:end].text
-            # Look for values near the test name
-            for token in doc[end:end+10]:  # Look ahead 10 tokens
-                if re.match(r'\d+\.?\d*', token.text):
-                    tests[test_name] = token.text
-                    break
-        
+
+        # Long reports are tokenized as line-aligned chunks in batches
+        for doc in self.nlp.pipe(self._chunks(text), batch_size=Config.NLP_BATCH_SIZE):
+            doc_text = doc.text  # built from the tokens on every access, so only once per doc
+            # Find deficiency mentions
+            matches = self.deficiency_matcher(doc)
+            for match_id, start, end in matches:
+                span = doc[start:end]
+                deficiencies.append(span.text)
+
+            # Find test names and values
+            matches = self.test_matcher(doc)
+            test_starts = {start for _, start, _ in matches}
+            for match_id, start, end in matches:
+                test_name = doc[start:end].text.lower()
+                qualifier = self._qualifier(doc_text, doc[start:end])
+                if qualifier:
+                    test_name = f"{test_name} ({qualifier})"
+                # Look for values near the test name
+                for token in doc[end:end+10]:  # Look ahead 10 tokens
+                    if token.i in test_starts:
+                        break  # the next test's value isn't this one's
+                    if re.match(r'\d+\.?\d*', token.text):
+                        # Keep the unit written after the value ("15 ng/mL"); the tokenizer splits it up
+                        value = VALUE_WITH_UNIT.match(doc_text, token.idx)
+                        value = value.group().strip() if value else token.text
+                        if test_name not in tests:
+                            tests[test_name] = value
+                        elif tests[test_name] != value:
+                            # e.g. "Serum Iron 45" and "Iron binding capacity 400": no single value to trust
+                            tests[test_name] = None
+                        break
+
         return {
             'deficiency_mentions': deficiencies,
             'test_results': tests
-        }
\ No newline at end of file
+        }
+
+    @staticmethod
+    def _qualifier(doc_text: str, span) -> str:
+        """Qualifier such as ionized or urine on the test name's line, or '' for the plain test"""
+        line_start = doc_text.rfind('\n', 0, span.start_char) + 1
+        line_end = doc_text.find('\n', span.end_char)
+        match = QUALIFIER_PATTERN.search(doc_text, line_start, line_end if line_end != -1 else len(doc_text))
+        if not match:
+            return ''
+        qualifier = match.group(1).lower()
+        if qualifier.startswith('24'):
+            return '24h'
+        return {'ionised': 'ionized', 'urinary': 'urine'}.get(qualifier, qualifier)
+
+    def line_matches(self, lines: List[str]) -> List[Tuple[bool, bool]]:
+        """(mentions a test, mentions a deficiency) for each line"""
+        return [
+            (bool(self.test_matcher(doc)), bool(self.deficiency_matcher(doc)))
+            for doc in self.nlp.pipe(lines, batch_size=Config.NLP_BATCH_SIZE * 64)
+        ]
+
+    def _chunks(self, text: str) -> Iterator[str]:
+        """Split text at line breaks into pieces of about NLP_CHUNK_CHARS, keeping each result line whole"""
+        limit = Config.NLP_CHUNK_CHARS
+        start = 0
+        while len(text) - start > limit:
+            end = text.rfind('\n', start, start + limit)
+            if end <= start:
+                end = text.find('\n', start + limit)
+                if end == -1:
+                    break
+            yield text[start:end]
+            start = end + 1
+        yield text[start:]
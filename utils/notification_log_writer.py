@@ -0,0 +1,81 @@
+import atexit
+import logging
+import queue
+import time
+from datetime import datetime
+from threading import Lock, Thread
+
+_STOP = object()
+
+class NotificationLogWriter:
+    """
+    Buffers notification log entries and writes them to storage in batches,
+    every batch_size entries or flush_interval_ms milliseconds, whichever comes
+    first. The buffer is bounded: when the writer falls behind, log() blocks the
+    caller instead of letting memory grow. Pending entries are flushed on close()
+    and at interpreter exit.
+    """
+
+    def __init__(self, storage, batch_size: int, flush_interval_ms: int, max_pending: int):
+        self.storage = storage
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.logger = logging.getLogger(__name__)
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._lock = Lock()
+        self._thread = None
+
+    def log(self, plan_id: str, date: str, activity_id: str, timestamp: datetime):
+        self._ensure_started()
+        self._queue.put({
+            'plan_id': plan_id,
+            'date': date,
+            'activity_id': activity_id,
+            'timestamp': timestamp
+        })
+
+    def close(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def _ensure_started(self):
+        # Started on first use so processes that never log don't run a writer thread
+        if self._thread:
+            return
+        with self._lock:
+            if not self._thread:
+                self._thread = Thread(target=self._run, name="notification-log-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            if batch[0] is _STOP:
+                break
+
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    entry = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if entry is _STOP:
+                    stopping = True
+                    break
+                batch.append(entry)
+
+            self._write(batch)
+
+    def _write(self, batch):
+        try:
+            self.storage.log_notifications(batch)
+        except Exception as e:
+            self.logger.error(f"Failed to write {len(batch)} notification logs: {str(e)}")
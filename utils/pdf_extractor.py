@@ -0,0 +1,132 @@
+import logging
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Pattern
+
+# Reader for the file a pool worker last extracted from: (path, mtime), PdfReader
+_worker_reader = None
+
+# The web process is multi-threaded and holds gRPC channels (Firestore, Gemini); forking it
+# can deadlock a worker on a lock another thread held and gRPC doesn't survive fork
+POOL_START_METHOD = 'forkserver'
+
+def _open_reader(file_path: str):
+    import PyPDF2
+    return PyPDF2.PdfReader(file_path)
+
+def _extract_page_batch(file_path: str, start: int, end: int) -> List[str]:
+    """Runs in a pool worker; the parsed document is kept for the next batch of the same file"""
+    global _worker_reader
+    stamp = (file_path, os.path.getmtime(file_path))
+    if _worker_reader is None or _worker_reader[0] != stamp:
+        _worker_reader = (stamp, _open_reader(file_path))
+    reader = _worker_reader[1]
+    return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+class PdfTextExtractor:
+    """
+    Extracts PDF text page by page. Short documents are read in-process;
+    longer ones are split into page batches that a process pool extracts in
+    parallel, while pages are still yielded in page order. Closing the
+    generator early cancels the batches not yet started. Pool workers are
+    started from a fork server, never forked from the web process. Like
+    spawned processes, each worker first re-imports the main script as
+    __mp_main__, so a main script must keep its setup behind
+    `if __name__ == '__main__'` (app.py builds its services in create_app).
+    """
+
+    def __init__(self, workers: int, batch_pages: int, parallel_min_pages: int,
+                 max_pages: int = 0, max_bytes: int = 0):
+        self.workers = workers
+        self.batch_pages = max(1, batch_pages)
+        self.parallel_min_pages = parallel_min_pages
+        self.max_pages = max_pages  # 0 for no limit
+        self.max_bytes = max_bytes  # 0 for no limit
+        self.logger = logging.getLogger(__name__)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def iter_pages(self, file_path: str) -> Iterator[str]:
+        """Yield the text of each page in order, within the page and byte caps"""
+        reader = _open_reader(file_path)
+        page_count = len(reader.pages)
+        if self.max_pages and page_count > self.max_pages:
+            self.logger.warning(f"Extracting the first {self.max_pages} of {page_count} PDF pages")
+            page_count = self.max_pages
+
+        if self.workers > 1 and page_count >= self.parallel_min_pages:
+            pages = self._parallel_pages(file_path, page_count)
+        else:
+            pages = (reader.pages[i].extract_text() or "" for i in range(page_count))
+
+        remaining = self.max_bytes
+        try:
+            for text in pages:
+                if self.max_bytes:
+                    size = len(text.encode('utf-8'))
+                    if size >= remaining:
+                        self.logger.warning(f"PDF text reached the {self.max_bytes} byte limit")
+                        yield text.encode('utf-8')[:remaining].decode('utf-8', errors='ignore')
+                        return
+                    remaining -= size
+                yield text
+        finally:
+            pages.close()
+
+    def extract(self, file_path: str, section_pattern: Optional[Pattern] = None, stop_after: int = 0) -> str:
+        """
+        Join the page texts of a PDF. With a section_pattern, extraction stops
+        once stop_after consecutive pages after a matching page don't match.
+        """
+        texts = []
+        pages_since_match = None
+        pages = self.iter_pages(file_path)
+        try:
+            for text in pages:
+                texts.append(text)
+                if section_pattern is None or not stop_after:
+                    continue
+                if section_pattern.search(text):
+                    pages_since_match = 0
+                elif pages_since_match is not None:
+                    pages_since_match += 1
+                    if pages_since_match >= stop_after:
+                        self.logger.info(f"Stopped PDF extraction after page {len(texts)}, past the results section")
+                        break
+        finally:
+            pages.close()
+        return "\n".join(texts)
+
+    def close(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def _parallel_pages(self, file_path: str, page_count: int) -> Iterator[str]:
+        pool = self._get_pool()
+        batches = deque(
+            (start, min(start + self.batch_pages, page_count))
+            for start in range(0, page_count, self.batch_pages)
+        )
+        # Keep a couple of batches per worker in flight so an early stop wastes little work
+        in_flight = deque()
+        try:
+            while batches or in_flight:
+                while batches and len(in_flight) < self.workers * 2:
+                    start, end = batches.popleft()
+                    in_flight.append(pool.submit(_extract_page_batch, file_path, start, end))
+                yield from in_flight.popleft().result()
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context(POOL_START_METHOD))
+            return self._pool
@@ -0,0 +1,277 @@
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+from models.medical_report import MedicalReport
+from models.extracted_content import ExtractedContent
+from models.recovery_plan import DailyActivity, RecoveryPlan, completion_path, read_path, set_path
+from models.summary import PlanSummary, ReportSummary, parse_cursor
+from utils.storage import StorageBackend
+
+class SQLiteStorage(StorageBackend):
+    """
+    Local SQLite storage backend. Documents are stored as JSON with indexed
+    user_id/email columns, and plans use the same per-day layout as Firestore,
+    so an activity toggle rewrites a single day row.
+    """
+    
+    def __init__(self, db_path: str):
+        super().__init__()
+        self.db_path = db_path
+        self._local = threading.local()
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS users (
+                id TEXT PRIMARY KEY,
+                email TEXT,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_users_email ON users (email);
+            CREATE TABLE IF NOT EXISTS medical_reports (
+                report_id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_medical_reports_user ON medical_reports (user_id);
+            CREATE TABLE IF NOT EXISTS report_extractions (
+                extraction_key TEXT PRIMARY KEY,
+                file_hash TEXT NOT NULL,
+                data TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS recovery_plans (
+                plan_id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_recovery_plans_user ON recovery_plans (user_id);
+            CREATE TABLE IF NOT EXISTS plan_days (
+                plan_id TEXT NOT NULL,
+                day TEXT NOT NULL,
+                data TEXT NOT NULL,
+                PRIMARY KEY (plan_id, day)
+            );
+            CREATE TABLE IF NOT EXISTS report_summaries (
+                report_id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                upload_date TEXT NOT NULL,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_report_summaries_user
+                ON report_summaries (user_id, upload_date DESC, report_id DESC);
+            CREATE TABLE IF NOT EXISTS plan_summaries (
+                plan_id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                start_date TEXT NOT NULL,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_plan_summaries_user
+                ON plan_summaries (user_id, start_date DESC, plan_id DESC);
+            CREATE TABLE IF NOT EXISTS notification_logs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                plan_id TEXT,
+                date TEXT,
+                activity_id TEXT,
+                timestamp TEXT
+            );
+        """)
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(medical_reports)")]
+        if 'file_hash' not in columns:
+            # Databases created before duplicate uploads reused analyses
+            conn.execute("ALTER TABLE medical_reports ADD COLUMN file_hash TEXT")
+            conn.execute("UPDATE medical_reports SET file_hash = json_extract(data, '$.file_hash')")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_medical_reports_file_hash ON medical_reports (file_hash)")
+    
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections can't be shared between threads, so keep one per thread
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            self._local.conn = conn
+        return conn
+    
+    @contextmanager
+    def _transaction(self):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    
+    def _fetch_one(self, query: str, params) -> dict:
+        row = self._connection().execute(query, params).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    # User operations
+    def _load_user(self, user_id: str) -> dict:
+        return self._fetch_one("SELECT data FROM users WHERE id = ?", (user_id,))
+    
+    def _load_user_by_email(self, email: str) -> dict:
+        return self._fetch_one("SELECT data FROM users WHERE email = ? LIMIT 1", (email,))
+    
+    def _write_user(self, user_data: dict):
+        with self._transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO users (id, email, data) VALUES (?, ?, ?)",
+                         (user_data['id'], user_data.get('email'), json.dumps(user_data)))
+    
+    def _update_user(self, user_id: str, changes: dict):
+        with self._transaction() as conn:
+            row = conn.execute("SELECT data FROM users WHERE id = ?", (user_id,)).fetchone()
+            if not row:
+                raise KeyError(f"No user {user_id}")
+            user_data = dict(json.loads(row[0]), **changes)
+            conn.execute("UPDATE users SET email = ?, data = ? WHERE id = ?",
+                         (user_data.get('email'), json.dumps(user_data), user_id))
+    
+    # Report operations
+    def save_report(self, report: MedicalReport):
+        summary = ReportSummary.from_report(report)
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO medical_reports (report_id, user_id, file_hash, data) VALUES (?, ?, ?, ?)",
+                (report.report_id, report.user_id, report.file_hash, json.dumps(report.to_dict()))
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO report_summaries (report_id, user_id, upload_date, data) VALUES (?, ?, ?, ?)",
+                (summary.report_id, summary.user_id, summary.upload_date, json.dumps(summary.to_dict()))
+            )
+    
+    def get_report(self, report_id: str) -> MedicalReport:
+        data = self._fetch_one("SELECT data FROM medical_reports WHERE report_id = ?", (report_id,))
+        return MedicalReport.from_dict(data) if data else None
+    
+    def get_user_reports(self, user_id: str) -> List[MedicalReport]:
+        rows = self._connection().execute("SELECT data FROM medical_reports WHERE user_id = ?", (user_id,))
+        return [MedicalReport.from_dict(json.loads(row[0])) for row in rows]
+    
+    def delete_report(self, report_id: str):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM medical_reports WHERE report_id = ?", (report_id,))
+            conn.execute("DELETE FROM report_summaries WHERE report_id = ?", (report_id,))
+    
+    def find_analyzed_report(self, file_hash: str, analysis_version: str) -> Optional[MedicalReport]:
+        rows = self._connection().execute("SELECT data FROM medical_reports WHERE file_hash = ?", (file_hash,))
+        for row in rows:
+            report = MedicalReport.from_dict(json.loads(row[0]))
+            if report.is_analyzed(analysis_version):
+                return report
+        return None
+    
+    def list_user_reports(self, user_id: str, limit: int = 20,
+                          cursor: str = None) -> Tuple[List[ReportSummary], Optional[str]]:
+        rows = self._page("report_summaries", "upload_date", "report_id", user_id, limit, cursor)
+        return self._paginate([ReportSummary.from_dict(json.loads(row[0])) for row in rows], limit)
+    
+    # Extracted report content
+    def get_extraction(self, key: str) -> Optional[ExtractedContent]:
+        data = self._fetch_one("SELECT data FROM report_extractions WHERE extraction_key = ?", (key,))
+        return ExtractedContent.from_dict(data) if data else None
+    
+    def save_extraction(self, extraction: ExtractedContent):
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO report_extractions (extraction_key, file_hash, data) VALUES (?, ?, ?)",
+                (extraction.key, extraction.file_hash, json.dumps(extraction.to_dict()))
+            )
+    
+    # Recovery plan operations
+    def _write_plan(self, plan: RecoveryPlan, days: List[date], removed_days: List[date]):
+        summary = PlanSummary.from_plan(plan)
+        with self._transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO recovery_plans (plan_id, user_id, data) VALUES (?, ?, ?)",
+                         (plan.plan_id, plan.user_id, json.dumps(plan.metadata_to_dict())))
+            conn.executemany(
+                "INSERT OR REPLACE INTO plan_days (plan_id, day, data) VALUES (?, ?, ?)",
+                [(plan.plan_id, day.isoformat(), json.dumps(plan.day_to_dict(day))) for day in days]
+            )
+            conn.executemany("DELETE FROM plan_days WHERE plan_id = ? AND day = ?",
+                             [(plan.plan_id, day.isoformat()) for day in removed_days])
+            conn.execute(
+                "INSERT OR REPLACE INTO plan_summaries (plan_id, user_id, start_date, data) VALUES (?, ?, ?, ?)",
+                (summary.plan_id, summary.user_id, summary.start_date, json.dumps(summary.to_dict()))
+            )
+    
+    def get_recovery_plan(self, plan_id: str) -> RecoveryPlan:
+        metadata = self._fetch_one("SELECT data FROM recovery_plans WHERE plan_id = ?", (plan_id,))
+        if not metadata:
+            return None
+        rows = self._connection().execute("SELECT data FROM plan_days WHERE plan_id = ?", (plan_id,))
+        return RecoveryPlan.from_documents(metadata, [json.loads(row[0]) for row in rows])
+    
+    def get_plan_owner(self, plan_id: str) -> str:
+        row = self._connection().execute("SELECT user_id FROM recovery_plans WHERE plan_id = ?",
+                                         (plan_id,)).fetchone()
+        return row[0] if row else None
+    
+    def get_plan_day(self, plan_id: str, day: date) -> List[DailyActivity]:
+        data = self._fetch_one("SELECT data FROM plan_days WHERE plan_id = ? AND day = ?",
+                               (plan_id, day.isoformat()))
+        if not data:
+            return []
+        metadata = self._fetch_one("SELECT data FROM recovery_plans WHERE plan_id = ?", (plan_id,)) or {}
+        return RecoveryPlan.day_from_dict(data, metadata.get('day_templates'))[1]
+    
+    def get_user_plans(self, user_id: str) -> List[RecoveryPlan]:
+        rows = self._connection().execute("SELECT plan_id FROM recovery_plans WHERE user_id = ?", (user_id,))
+        return [self.get_recovery_plan(row[0]) for row in rows.fetchall()]
+    
+    def list_user_plans(self, user_id: str, limit: int = 20,
+                        cursor: str = None) -> Tuple[List[PlanSummary], Optional[str]]:
+        rows = self._page("plan_summaries", "start_date", "plan_id", user_id, limit, cursor)
+        return self._paginate([PlanSummary.from_dict(json.loads(row[0])) for row in rows], limit)
+    
+    def _page(self, table: str, sort_column: str, id_column: str, user_id: str, limit: int, cursor: str):
+        # Keyset pagination over the (user_id, sort desc, id desc) index
+        query = f"SELECT data FROM {table} WHERE user_id = ?"
+        params = [user_id]
+        position = parse_cursor(cursor)
+        if position:
+            query += f" AND ({sort_column}, {id_column}) < (?, ?)"
+            params.extend(position)
+        query += f" ORDER BY {sort_column} DESC, {id_column} DESC LIMIT ?"
+        params.append(limit + 1)
+        return self._connection().execute(query, params).fetchall()
+    
+    def update_activity_status(self, plan_id: str, date_str: str, activity_id: str, completed: bool) -> bool:
+        day_key = datetime.strptime(date_str, '%Y-%m-%d').date().isoformat()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT data FROM plan_days WHERE plan_id = ? AND day = ?",
+                               (plan_id, day_key)).fetchone()
+            if not row:
+                return False
+            day = json.loads(row[0])
+            path = completion_path(day, activity_id)
+            if path is None:
+                return False
+            previous = bool(read_path(day, path))
+            set_path(day, path, completed)
+            conn.execute("UPDATE plan_days SET data = ? WHERE plan_id = ? AND day = ?",
+                         (json.dumps(day), plan_id, day_key))
+            if previous != completed:
+                self._adjust_completed(conn, plan_id, 1 if completed else -1)
+            return True
+    
+    def _adjust_completed(self, conn, plan_id: str, delta: int):
+        row = conn.execute("SELECT data FROM plan_summaries WHERE plan_id = ?", (plan_id,)).fetchone()
+        if row:
+            summary = json.loads(row[0])
+            summary['completed_activities'] += delta
+            conn.execute("UPDATE plan_summaries SET data = ? WHERE plan_id = ?", (json.dumps(summary), plan_id))
+    
+    # Notification logs
+    def log_notifications(self, entries: List[dict]):
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT INTO notification_logs (plan_id, date, activity_id, timestamp) VALUES (?, ?, ?, ?)",
+                [(e['plan_id'], e['date'], e['activity_id'], e['timestamp'].isoformat()) for e in entries]
+            )
@@ -0,0 +1,165 @@
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+from config import Config
+from models.user import User
+from models.medical_report import MedicalReport
+from models.extracted_content import ExtractedContent
+from models.recovery_plan import DailyActivity, RecoveryPlan
+from models.summary import PlanSummary, ReportSummary
+from utils.user_cache import UserCache
+
+class StorageBackend:
+    """
+    Storage interface shared by the Firestore, SQLite and in-memory backends.
+    User reads go through the in-process UserCache here, so every backend
+    only implements the raw _load/_write user primitives.
+    """
+
+    def __init__(self):
+        self.user_cache = UserCache(Config.USER_CACHE_SIZE, Config.USER_CACHE_TTL_SECONDS)
+
+    # User operations
+    def get_user(self, user_id: str) -> User:
+        user = self.user_cache.get(user_id)
+        if user:
+            return user
+
+        data = self._load_user(user_id)
+        if data:
+            user = User.from_dict(data)
+            self.user_cache.put(user)
+            return user
+        return None
+
+    def get_user_by_email(self, email: str) -> User:
+        user = self.user_cache.get_by_email(email)
+        if user:
+            return user
+
+        data = self._load_user_by_email(email)
+        if data:
+            user = User.from_dict(data)
+            self.user_cache.put(user)
+            return user
+        return None
+
+    def create_user(self, user_data: dict) -> User:
+        self._write_user(user_data)
+        self.user_cache.invalidate(user_data['id'])
+        return User.from_dict(user_data)
+
+    def update_user(self, user_id: str, changes: dict):
+        """Apply profile changes and drop the cached copy so the next read sees them"""
+        self._update_user(user_id, changes)
+        self.user_cache.invalidate(user_id)
+
+    def _load_user(self, user_id: str) -> dict:
+        raise NotImplementedError
+
+    def _load_user_by_email(self, email: str) -> dict:
+        raise NotImplementedError
+
+    def _write_user(self, user_data: dict):
+        raise NotImplementedError
+
+    def _update_user(self, user_id: str, changes: dict):
+        raise NotImplementedError
+
+    # Report operations
+    def save_report(self, report: MedicalReport):
+        raise NotImplementedError
+
+    def get_report(self, report_id: str) -> MedicalReport:
+        raise NotImplementedError
+
+    def get_user_reports(self, user_id: str) -> List[MedicalReport]:
+        raise NotImplementedError
+
+    def delete_report(self, report_id: str):
+        """Remove a report and its summary"""
+        raise NotImplementedError
+
+    def find_analyzed_report(self, file_hash: str, analysis_version: str) -> Optional[MedicalReport]:
+        """Any report of the same file content that already holds an analysis at this version"""
+        raise NotImplementedError
+
+    def list_user_reports(self, user_id: str, limit: int = 20,
+                          cursor: str = None) -> Tuple[List[ReportSummary], Optional[str]]:
+        """Newest-first page of report summaries and the cursor for the next page"""
+        raise NotImplementedError
+
+    # Extracted report content, shared by every report with the same file
+    def get_extraction(self, key: str) -> Optional[ExtractedContent]:
+        raise NotImplementedError
+
+    def save_extraction(self, extraction: ExtractedContent):
+        raise NotImplementedError
+
+    # Recovery plan operations
+    def save_recovery_plan(self, plan: RecoveryPlan):
+        self._write_plan(plan, list(plan.daily_activities), [])
+        plan.mark_saved()
+
+    def get_recovery_plan(self, plan_id: str) -> RecoveryPlan:
+        raise NotImplementedError
+
+    def get_plan_owner(self, plan_id: str) -> str:
+        raise NotImplementedError
+
+    def get_plan_day(self, plan_id: str, day: date) -> List[DailyActivity]:
+        """One day's activities; backends override this to avoid loading the whole plan"""
+        plan = self.get_recovery_plan(plan_id)
+        return plan.get_daily_activities(day) if plan else []
+
+    def get_user_plans(self, user_id: str) -> List[RecoveryPlan]:
+        raise NotImplementedError
+
+    def list_user_plans(self, user_id: str, limit: int = 20,
+                        cursor: str = None) -> Tuple[List[PlanSummary], Optional[str]]:
+        """Newest-first page of plan summaries and the cursor for the next page"""
+        raise NotImplementedError
+
+    def update_activity_status(self, plan_id: str, date_str: str, activity_id: str, completed: bool) -> bool:
+        raise NotImplementedError
+
+    def update_recovery_plan(self, plan: RecoveryPlan):
+        """Write the plan's metadata and only the days changed since it was loaded"""
+        self._write_plan(plan, plan.dirty_days(), plan.removed_days())
+        plan.mark_saved()
+
+    def _write_plan(self, plan: RecoveryPlan, days: List[date], removed_days: List[date]):
+        """Write metadata, summary and the given day documents, and delete removed_days"""
+        raise NotImplementedError
+
+    # Notification logs
+    def log_notification(self, plan_id: str, date: str, activity_id: str, timestamp: datetime):
+        self.log_notifications([{
+            'plan_id': plan_id,
+            'date': date,
+            'activity_id': activity_id,
+            'timestamp': timestamp
+        }])
+
+    def log_notifications(self, entries: List[dict]):
+        raise NotImplementedError
+
+    @staticmethod
+    def _paginate(summaries: list, limit: int):
+        # Backends fetch limit + 1 rows; the extra one only tells us another page exists
+        if len(summaries) > limit:
+            return summaries[:limit], summaries[limit - 1].cursor
+        return summaries, None
+
+def create_storage(backend: str = None) -> StorageBackend:
+    """Build the storage backend selected by Config.STORAGE_BACKEND"""
+    backend = backend or Config.STORAGE_BACKEND
+    if backend == 'firestore':
+        from utils.firebase_client import FirebaseClient
+        return FirebaseClient()
+    if backend == 'sqlite':
+        from utils.sqlite_storage import SQLiteStorage
+        return SQLiteStorage(Config.SQLITE_STORAGE_PATH)
+    if backend == 'memory':
+        from utils.memory_storage import InMemoryStorage
+        return InMemoryStorage()
+    raise ValueError(f"Unknown storage backend: {backend}")
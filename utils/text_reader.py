@@ -0,0 +1,81 @@
+import codecs
+import mmap
+import os
+from typing import Union
+
+# Checked longest first: the UTF-32 LE mark starts with the UTF-16 LE one
+BOMS = [
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+# Bytes cp1252 leaves undefined; text containing them is read as latin-1 instead
+CP1252_UNDEFINED = frozenset(b'\x81\x8d\x8f\x90\x9d')
+
+class DecodedText:
+    """Contents of a text file together with how it was decoded"""
+
+    def __init__(self, text: str, encoding: str, size: int, memory_mapped: bool = False):
+        self.text = text
+        self.encoding = encoding
+        self.size = size  # bytes on disk
+        self.memory_mapped = memory_mapped
+
+def read_text_file(file_path: str, sample_bytes: int = 64 * 1024, mmap_min_bytes: int = 1024 * 1024) -> DecodedText:
+    """
+    Read a text file once and decode it. The encoding comes from a byte order
+    mark if there is one, otherwise from the first sample_bytes; files of at
+    least mmap_min_bytes are memory-mapped instead of copied into memory.
+    """
+    with open(file_path, 'rb') as file:
+        size = os.fstat(file.fileno()).st_size
+        if size == 0:
+            return DecodedText("", 'utf-8', 0)
+        if size < mmap_min_bytes:
+            return _decode(file.read(), size, sample_bytes, memory_mapped=False)
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return _decode(data, size, sample_bytes, memory_mapped=True)
+
+def detect_encoding(sample: Union[bytes, mmap.mmap]) -> str:
+    for bom, encoding in BOMS:
+        if sample[:len(bom)] == bom:
+            return encoding
+
+    # ASCII-range UTF-16 without a BOM has a NUL in every other byte
+    even_nuls = sample[0::2].count(0)
+    odd_nuls = sample[1::2].count(0)
+    if max(even_nuls, odd_nuls) > len(sample) // 4:
+        return 'utf-16-le' if odd_nuls > even_nuls else 'utf-16-be'
+
+    try:
+        # final=False: the sample may end partway through a multi-byte character
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return _single_byte_encoding(sample)
+
+def _single_byte_encoding(data: Union[bytes, mmap.mmap]) -> str:
+    undefined = any(data.find(bytes([byte])) != -1 for byte in CP1252_UNDEFINED)
+    return 'latin-1' if undefined else 'cp1252'
+
+def _decode(data, size: int, sample_bytes: int, memory_mapped: bool) -> DecodedText:
+    sample = bytes(data[:sample_bytes])
+    encoding = detect_encoding(sample)
+    try:
+        text = str(data, encoding)
+    except UnicodeDecodeError:
+        if encoding in ('utf-8', 'cp1252'):
+            # The sample decoded but something further on doesn't
+            encoding = _single_byte_encoding(data)
+            text = str(data, encoding)
+        else:
+            # A BOM or NUL pattern settled the encoding; show the damage rather than latin-1 noise
+            text = str(data, encoding, errors='replace')
+
+    # Match what reading in text mode gave: universal newlines
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return DecodedText(text, encoding, size, memory_mapped)
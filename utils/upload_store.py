@@ -0,0 +1,154 @@
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import BinaryIO, Optional
+
+class StoredUpload:
+    """Where an upload's content lives, what type this upload is, and whether it added the content"""
+
+    def __init__(self, file_hash: str, path: str, size: int, duplicate: bool, file_type: str = None):
+        self.file_hash = file_hash
+        self.path = path
+        self.size = size
+        self.duplicate = duplicate  # the same content was already stored
+        self.file_type = file_type  # this upload's extension; a shared path keeps the first upload's
+
+class UploadStore:
+    """
+    Content-addressed storage for uploaded reports. Files are streamed to
+    disk while their SHA-256 is computed and kept once under
+    <root>/<hash[:2]>/<hash><ext>, however many reports refer to them. An
+    SQLite index counts the reports using each file; the file is deleted
+    when the last one is released.
+    """
+
+    def __init__(self, root: str, index_path: str, chunk_size: int = 1024 * 1024):
+        self.root = root
+        self.index_path = index_path
+        self.chunk_size = chunk_size
+        self._lock = threading.Lock()  # orders removal against new references in this process
+        os.makedirs(os.path.join(self.root, 'tmp'), exist_ok=True)
+        directory = os.path.dirname(index_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS blobs (
+                    file_hash TEXT PRIMARY KEY,
+                    path TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    ref_count INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS blob_refs (
+                    report_id TEXT PRIMARY KEY,
+                    file_hash TEXT NOT NULL
+                );
+            """)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.index_path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def save(self, stream: BinaryIO, filename: str, report_id: str) -> StoredUpload:
+        """Store an upload for a report, reusing the file if the same content is already stored"""
+        _, ext = os.path.splitext(filename.lower())
+        digest = hashlib.sha256()
+        size = 0
+        fd, temp_path = tempfile.mkstemp(dir=os.path.join(self.root, 'tmp'))
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                for chunk in iter(lambda: stream.read(self.chunk_size), b''):
+                    digest.update(chunk)
+                    file.write(chunk)
+                    size += len(chunk)
+            file_hash = digest.hexdigest()
+
+            with self._lock, self._transaction() as conn:
+                row = conn.execute("SELECT path FROM blobs WHERE file_hash = ?", (file_hash,)).fetchone()
+                duplicate = row is not None and os.path.exists(row[0])
+                if duplicate:
+                    path = row[0]
+                else:
+                    path = os.path.join(self.root, file_hash[:2], file_hash + ext)
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    os.replace(temp_path, path)
+                    conn.execute(
+                        "INSERT INTO blobs (file_hash, path, size, ref_count, created_at) VALUES (?, ?, ?, 0, ?) "
+                        "ON CONFLICT (file_hash) DO UPDATE SET path = excluded.path, size = excluded.size",
+                        (file_hash, path, size, time.time())
+                    )
+                self._add_reference(conn, file_hash, report_id)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return StoredUpload(file_hash, path, size, duplicate, ext)
+
+    def release(self, report_id: str) -> bool:
+        """Drop a report's reference; returns True when that removed the stored file"""
+        removed_path = None
+        with self._lock:
+            try:
+                with self._transaction() as conn:
+                    row = conn.execute("SELECT file_hash FROM blob_refs WHERE report_id = ?",
+                                       (report_id,)).fetchone()
+                    if not row:
+                        return False
+                    conn.execute("DELETE FROM blob_refs WHERE report_id = ?", (report_id,))
+                    conn.execute("UPDATE blobs SET ref_count = ref_count - 1 WHERE file_hash = ?", row)
+                    blob = conn.execute("SELECT path, ref_count FROM blobs WHERE file_hash = ?", row).fetchone()
+                    if blob[1] > 0:
+                        return False
+                    conn.execute("DELETE FROM blobs WHERE file_hash = ?", row)
+                    # Moved out of its path before COMMIT: saves in other processes wait on the write
+                    # lock, so none can store fresh content there until the path is already free
+                    if os.path.exists(blob[0]):
+                        removed_path = os.path.join(self.root, 'tmp', f"released_{report_id}")
+                        os.replace(blob[0], removed_path)
+            except Exception:
+                # Rolled back, so the blob row is still there; put the file back with it
+                if removed_path and os.path.exists(removed_path):
+                    os.replace(removed_path, blob[0])
+                raise
+        if removed_path:
+            os.remove(removed_path)
+        return True
+
+    def ref_count(self, file_hash: str) -> int:
+        with self._connect() as conn:
+            row = conn.execute("SELECT ref_count FROM blobs WHERE file_hash = ?", (file_hash,)).fetchone()
+        return row[0] if row else 0
+
+    def path_for(self, file_hash: str) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT path FROM blobs WHERE file_hash = ?", (file_hash,)).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _add_reference(conn, file_hash: str, report_id: str):
+        # A report holds at most one reference, so a retried save doesn't inflate the count
+        inserted = conn.execute(
+            "INSERT OR IGNORE INTO blob_refs (report_id, file_hash) VALUES (?, ?)", (report_id, file_hash)
+        ).rowcount
+        if inserted:
+            conn.execute("UPDATE blobs SET ref_count = ref_count + 1 WHERE file_hash = ?", (file_hash,))
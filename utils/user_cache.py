@@ -0,0 +1,67 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional
+from models.user import User
+
+class UserCache:
+    """
+    In-process TTL + LRU cache of User objects, looked up by id or by email.
+    Entries expire after ttl_seconds so changes made by other workers are
+    picked up; writes made through this process invalidate immediately.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+        self._users = OrderedDict()  # user id -> (expires_at, user), least recently used first
+        self._ids_by_email = {}
+
+    def get(self, user_id: str) -> Optional[User]:
+        with self._lock:
+            return self._get(user_id)
+
+    def get_by_email(self, email: str) -> Optional[User]:
+        with self._lock:
+            user_id = self._ids_by_email.get(email)
+            if user_id is None:
+                self.misses += 1
+                return None
+            return self._get(user_id)
+
+    def put(self, user: User):
+        with self._lock:
+            self._remove(user.id)
+            self._users[user.id] = (time.monotonic() + self.ttl_seconds, user)
+            self._ids_by_email[user.email] = user.id
+            while len(self._users) > self.max_size:
+                self._remove(next(iter(self._users)))
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            self._remove(user_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._users)}
+
+    def _get(self, user_id: str) -> Optional[User]:
+        # Must be called with self._lock held
+        entry = self._users.get(user_id)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                self._remove(user_id)
+            self.misses += 1
+            return None
+        self._users.move_to_end(user_id)
+        self.hits += 1
+        return entry[1]
+
+    def _remove(self, user_id: str):
+        # Must be called with self._lock held
+        entry = self._users.pop(user_id, None)
+        if entry is not None and self._ids_by_email.get(entry[1].email) == user_id:
+            del self._ids_by_email[entry[1].email]